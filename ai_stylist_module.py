@@ -1,31 +1,91 @@
 # ai_stylist_module.py (FINAL VERSION WITH MEDIAPIPE CONTEXT)
-from google import genai
 from google.genai import types
 import os
-from wardrobe_db import get_wardrobe_summary
+import re
+import time
+import perf_metrics
+from conversation_memory import ConversationMemory
+from outfit_engine import candidates_digest, format_candidates, get_outfit_engine, offline_answer, parse_request
+from resource_registry import get_genai_client
+from response_cache import get_response_cache
+from stream_copy import StreamCopy
+from wardrobe_db import (
+    get_wardrobe_counts, get_wardrobe_hash, get_wardrobe_item_classes, get_wardrobe_summary, wardrobe_changed_since,
+)
 
 # --- Configuration ---
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 MODEL_NAME = 'gemini-2.5-flash' 
+# Live status the model sees when the session has no camera processor (vision failed to load)
+NO_VISION_STATUS = "No camera."
+FALLBACK_RESPONSE = "I apologize, but I'm having trouble connecting to my styling brain right now. Please try again in a moment."
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets/markdown), whitespace, and the
+# start of a new sentence (so "e.g. a chain" is not split)
+_SENTENCE_END = re.compile(r'[.!?]+["\')\]*]*\s+(?=[A-Z0-9"\'*(])')
+# Sentences shorter than this are held back and spoken together with the next one
+MIN_SENTENCE_CHARS = 20
+
+
+def split_sentences(chunks, min_chars=MIN_SENTENCE_CHARS):
+    """
+    Re-chunks a stream of text fragments into whole sentences as soon as each one is complete,
+    so speech can start before the full answer has arrived. The remainder is flushed at the end.
+    """
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        start = 0
+        for match in _SENTENCE_END.finditer(buffer):
+            if match.end() - start >= min_chars:
+                yield buffer[start:match.end()].strip()
+                start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def _prompt_tokens(response):
+    """The API's prompt token count for a response (or stream chunk), if it reported one."""
+    usage = getattr(response, 'usage_metadata', None)
+    return getattr(usage, 'prompt_token_count', None) if usage is not None else None
+
+
+def _cancelled(cancel_token):
+    return cancel_token is not None and cancel_token.cancelled
+
 
 class AIStylistModule:
     # FIX A: Accept the vision_processor instance
-    def __init__(self, vision_processor): 
+    def __init__(self, vision_processor=None, client=None, response_cache=None, outfit_engine=None): 
         print("Initializing AI Stylist Module...")
-        if not GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY environment variable not set.")
-            
-        self.client = genai.Client(api_key=GEMINI_API_KEY)
+        # The Gemini client (and its connection pool) is shared by all sessions;
+        # only the conversation memory below belongs to this user.
+        try:
+            self.client = client or get_genai_client(GEMINI_API_KEY)
+        except ValueError as e:
+            # No API key: every answer comes from the local outfit engine
+            print(f"{e} The stylist will answer offline.")
+            self.client = None
         self.system_prompt = self._get_system_prompt()
-        self.vision_processor = vision_processor # Store the instance
-        
-        # --- FIX APPLIED: Initialize chat with system instruction ---
-        self.chat = self.client.chats.create(
-            model=MODEL_NAME, 
-            config=types.GenerateContentConfig(
-                system_instruction=self.system_prompt 
-            )
-        ) 
+        self.vision_processor = vision_processor # Store the instance (None until vision is available)
+
+        # Answers to repeated questions (same command, vision status and wardrobe) are reused
+        self.response_cache = response_cache or get_response_cache()
+
+        # Local outfit candidates: sent to the model instead of the whole wardrobe, and used as the
+        # answer when the model cannot be reached
+        self.outfit_engine = outfit_engine or get_outfit_engine()
+
+        # Wardrobe summary (and label counts) reused until the wardrobe version moves on
+        self._wardrobe_version = None
+        self._wardrobe_summary = None
+        self._wardrobe_labels = None
+
+        # History is kept here under a token budget instead of in an ever-growing chat session;
+        # every request is a stateless generate_content call with the system instruction.
+        self.memory = ConversationMemory()
+        self.config = types.GenerateContentConfig(system_instruction=self.system_prompt)
         print("AI Stylist Module Ready.")
         
     # ai_stylist_module.py (Updated _get_system_prompt function)
@@ -47,34 +107,164 @@ class AIStylistModule:
             "A. **Color Harmony:** Mention how colors contrast or complement (e.g., 'The red brightens the black for a bold statement, but if you want to soften the look, a beige top would create an excellent earthy tone.')."
             "B. **Wardrobe Constraints:** Only use colors and items that are realistically found in a wardrobe (e.g., don't suggest items that are only detected as 'person' or 'TV')."
             "C. **Visual Context:** The vision status will tell you if the user is engaged (e.g., 'Hand detected.'). Use this to make the response more conversational."
+            "D. **Candidate Outfits:** When candidate outfits from the wardrobe are listed, base your suggestions on them (best first)."
             "\n\n"
             "NEVER mention the word 'prompt', 'YOLO', 'MediaPipe', or 'virtual wardrobe summary'."
         )
         return prompt
 
-    def generate_outfit_suggestion(self, user_command):
+    def _current_wardrobe_summary(self):
+        """Returns the cached (summary, label counts, version), refreshing them if the wardrobe changed."""
+        if self._wardrobe_summary is None or wardrobe_changed_since(self._wardrobe_version):
+            counts = get_wardrobe_counts()
+            self._wardrobe_version = counts['version']
+            self._wardrobe_labels = counts['labels']
+            self._wardrobe_summary = get_wardrobe_summary()
+        return self._wardrobe_summary, self._wardrobe_labels, self._wardrobe_version
+
+    def _prepare_turn(self, user_command, use_cache=True):
         """
-        Generates an outfit suggestion by combining the user's query,
-        live vision status, and the current wardrobe state.
+        Returns a dict for a user command: 'cache_key', 'cached' (response or None), 'message' for the
+        model, 'history' (what the memory keeps of it), 'wardrobe_state' for the memory and 'offline'
+        (the local answer, or None).
+        With use_cache=False the cached answer is ignored (it is still replaced by the new one).
         """
-        # Get the full wardrobe database summary
-        wardrobe_summary = get_wardrobe_summary()
-        
         # FIX B: Get live vision status from the processor instance (e.g., "Hand detected.")
-        live_vision_status = self.vision_processor.get_live_detections()
-        
+        live_vision_status = (self.vision_processor.get_live_detections() if self.vision_processor is not None
+                              else NO_VISION_STATUS)
+
+        # Repeat question with nothing changed: answer from the cache, no API round trip
+        cache_key = self.response_cache.make_key(user_command, live_vision_status, get_wardrobe_hash())
+        cached_response = self.response_cache.get(cache_key) if use_cache else None
+        if cached_response is not None:
+            message = f"**USER COMMAND:** '{user_command}'."
+            return {'cache_key': cache_key, 'cached': cached_response, 'message': message, 'history': message,
+                    'wardrobe_state': None, 'offline': None}
+
+        # Best local outfits for the occasion/color in the command (a few ms even for large wardrobes)
+        occasion, color = parse_request(user_command)
+        self.outfit_engine.update(*get_wardrobe_item_classes())
+        candidates = self.outfit_engine.recommend(occasion, color)
+
+        if candidates:
+            # The candidates only matter for this answer: history keeps a one-line digest of them,
+            # so each turn does not carry a near copy of the previous turn's list
+            wardrobe_block, wardrobe_state = "Candidate outfits, best first:\n" + format_candidates(candidates), None
+            history_block = candidates_digest(candidates)
+        else:
+            # Full wardrobe only when the model has not seen it yet, otherwise just what changed
+            wardrobe_summary, labels, version = self._current_wardrobe_summary()
+            wardrobe_block, wardrobe_state = self.memory.wardrobe_block(wardrobe_summary, labels, version)
+            history_block = wardrobe_block
+
         # Craft the full message to the model
-        full_command = (
+        header = (
             f"**USER COMMAND:** '{user_command}'.\n"
             f"**CURRENT LIVE VISION STATUS (Context):** {live_vision_status}\n"
-            f"**WARDROBE DATABASE (FOR RECOMMENDATIONS):**\n{wardrobe_summary}"
+            f"**WARDROBE DATABASE (FOR RECOMMENDATIONS):**\n"
         )
+        return {'cache_key': cache_key, 'cached': None, 'message': header + wardrobe_block,
+                'history': header + history_block, 'wardrobe_state': wardrobe_state,
+                'offline': offline_answer(candidates, occasion)}
+
+    def generate_outfit_suggestion(self, user_command, cancel_token=None, use_cache=True):
+        """
+        Generates an outfit suggestion by combining the user's query,
+        live vision status, and the current wardrobe state.
+        If 'cancel_token' is cancelled meanwhile, the answer is not added to the conversation.
+        use_cache=False always asks the model (e.g. "show me another one", which repeats word for word).
+        """
+        with perf_metrics.stage('stylist.prepare_turn'):
+            turn = self._prepare_turn(user_command, use_cache)
+        if turn['cached'] is not None:
+            perf_metrics.count('stylist.cache_hits')
+            self.memory.record_turn(turn['message'], turn['cached'], history_message=turn['history'])
+            return turn['cached']
+        if self.client is None:
+            perf_metrics.count('stylist.offline_answers')
+            return turn['offline'] or FALLBACK_RESPONSE
 
         try:
-            # Send the user's message.
-            response = self.chat.send_message(full_command)
+            with perf_metrics.stage('gemini.generate'):
+                response = self.client.models.generate_content(
+                    model=MODEL_NAME, contents=self.memory.build_contents(turn['message']), config=self.config
+                )
+            if response.text:
+                self.response_cache.set(turn['cache_key'], response.text)
+            if response.text and not _cancelled(cancel_token):
+                self.memory.record_turn(turn['message'], response.text, _prompt_tokens(response), turn['wardrobe_state'],
+                                        history_message=turn['history'])
             return response.text
         
         except Exception as e:
             print(f"Gemini API Error: {e}")
-            return "I apologize, but I'm having trouble connecting to my styling brain right now. Please try again in a moment."
\ No newline at end of file
+            perf_metrics.count('gemini.errors')
+            return turn['offline'] or FALLBACK_RESPONSE
+
+    def stream_outfit_suggestion(self, user_command, cancel_token=None, use_cache=True):
+        """
+        Streaming version of generate_outfit_suggestion: yields the answer one sentence at a time
+        while the model is still generating the rest. Stops reading the stream (and caches nothing)
+        as soon as 'cancel_token' is cancelled.
+        """
+        with perf_metrics.stage('stylist.prepare_turn'):
+            turn = self._prepare_turn(user_command, use_cache)
+        if turn['cached'] is not None:
+            perf_metrics.count('stylist.cache_hits')
+            self.memory.record_turn(turn['message'], turn['cached'], history_message=turn['history'])
+            yield from split_sentences([turn['cached']])
+            return
+        if self.client is None:
+            perf_metrics.count('stylist.offline_answers')
+            yield from split_sentences([turn['offline'] or FALLBACK_RESPONSE])
+            return
+
+        copy = StreamCopy()
+        usage = {}
+        sentences_sent = 0
+        try:
+            start = time.perf_counter()
+            stream = self.client.models.generate_content_stream(
+                model=MODEL_NAME, contents=self.memory.build_contents(turn['message']), config=self.config
+            )
+            for sentence in split_sentences(copy.tee(self._texts(stream, usage, cancel_token))):
+                if sentences_sent == 0 and not _cancelled(cancel_token):
+                    # Time to first sentence: what the user waits before Mira starts talking
+                    perf_metrics.record('gemini.first_sentence', time.perf_counter() - start)
+                sentences_sent += 1
+                yield sentence
+            if _cancelled(cancel_token):
+                # Cut short: its duration says nothing about how long a full answer takes
+                perf_metrics.count('gemini.cancelled_streams')
+            else:
+                perf_metrics.record('gemini.stream', time.perf_counter() - start)
+        except Exception as e:
+            print(f"Gemini API Error: {e}")
+            perf_metrics.count('gemini.errors')
+            if sentences_sent == 0:
+                yield from split_sentences([turn['offline'] or FALLBACK_RESPONSE])
+            return
+
+        full_text = copy.joined('').strip()
+        if full_text and not _cancelled(cancel_token):
+            self.response_cache.set(turn['cache_key'], full_text)
+            self.memory.record_turn(turn['message'], full_text, usage.get('prompt_tokens'), turn['wardrobe_state'],
+                                    history_message=turn['history'])
+
+    def prompt_token_stats(self):
+        """Per-turn prompt sizes (API-reported and estimated), oldest first."""
+        return list(self.memory.turn_stats)
+
+    @staticmethod
+    def _texts(stream, usage, cancel_token=None):
+        """
+        Yields the text of each streamed chunk until 'cancel_token' is cancelled.
+        The prompt token count (reported on the chunks) is stored in 'usage'.
+        """
+        for chunk in stream:
+            if _cancelled(cancel_token):
+                return
+            tokens = _prompt_tokens(chunk)
+            if tokens is not None:
+                usage['prompt_tokens'] = tokens
+            yield chunk.text or ''
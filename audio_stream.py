@@ -0,0 +1,155 @@
+# audio_stream.py (Bounded PCM ring buffer and streaming sounddevice playback)
+import threading
+
+import sounddevice as sd
+
+# Seconds of audio the ring buffer holds; the network reader blocks once it is this far ahead
+RING_BUFFER_SECONDS = 2.0
+BYTES_PER_SAMPLE = 2  # 16-bit little-endian PCM, mono
+
+
+class PCMRingBuffer:
+    """
+    Fixed-size byte ring between the network reader (writer) and the audio callback (reader).
+    Writers block while it is full, so memory stays bounded no matter how long the speech is.
+    cancel() bumps the epoch: writers that started before it get False and stop.
+    Only whole samples (frame_bytes = bytes per sample x channels) go in and out: network chunks
+    can split a sample, and a single stray byte would shift every later sample into noise.
+    """
+
+    def __init__(self, capacity, frame_bytes=BYTES_PER_SAMPLE):
+        self.frame_bytes = frame_bytes
+        self.capacity = capacity - capacity % frame_bytes
+        self._buffer = bytearray(self.capacity)
+        self._view = memoryview(self._buffer)
+        self._read_pos = 0
+        self._size = 0
+        self.epoch = 0
+        self._partial = b""  # start of a sample split across chunks, held until the rest arrives
+        self._changed = threading.Condition()
+
+    def write(self, data, epoch):
+        """Appends 'data', blocking while the ring is full. Returns False if cancelled meanwhile."""
+        if self._partial:
+            data = self._partial + bytes(data)
+        whole = len(data) - len(data) % self.frame_bytes
+        self._partial = bytes(data[whole:])
+        data = memoryview(data)[:whole]
+        while len(data):
+            with self._changed:
+                while self._size == self.capacity and self.epoch == epoch:
+                    self._changed.wait()
+                if self.epoch != epoch:
+                    return False
+                write_pos = (self._read_pos + self._size) % self.capacity
+                count = min(len(data), self.capacity - self._size, self.capacity - write_pos)
+                self._view[write_pos:write_pos + count] = data[:count]
+                self._size += count
+            data = data[count:]
+        return True
+
+    def read_into(self, out):
+        """
+        Copies up to len(out) bytes into 'out' without blocking (safe to call from the audio callback).
+        Always a whole number of samples, so the caller pads on a sample boundary.
+        """
+        with self._changed:
+            count = min(len(out), self._size)
+            count -= count % self.frame_bytes
+            first = min(count, self.capacity - self._read_pos)
+            out[:first] = self._view[self._read_pos:self._read_pos + first]
+            if count > first:
+                out[first:count] = self._view[:count - first]
+            self._read_pos = (self._read_pos + count) % self.capacity
+            self._size -= count
+            if count:
+                self._changed.notify_all()
+            return count
+
+    def end_clip(self):
+        """Drops a dangling partial sample at the end of a clip so the next clip starts aligned."""
+        self._partial = b""
+
+    def wait_empty(self, epoch):
+        """Blocks until everything written has been read, or the buffer is cancelled."""
+        with self._changed:
+            while self._size and self.epoch == epoch:
+                self._changed.wait()
+
+    def cancel(self):
+        """Discards buffered audio and releases blocked writers (their write() returns False)."""
+        with self._changed:
+            self.epoch += 1
+            self._read_pos = 0
+            self._size = 0
+            self._partial = b""
+            self._changed.notify_all()
+
+
+class StreamingAudioPlayer:
+    """
+    Plays raw 16-bit mono PCM as it arrives. The output stream opens on the first chunk,
+    so playback starts after one network chunk rather than after the whole response.
+    """
+
+    def __init__(self, sample_rate, buffer_seconds=RING_BUFFER_SECONDS):
+        self.sample_rate = sample_rate
+        self.ring = PCMRingBuffer(int(sample_rate * BYTES_PER_SAMPLE * buffer_seconds))
+        self._silence = bytes(self.ring.capacity)
+        self._stream = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        """True while speech is playing: from the first chunk until the output stream is drained or cancelled."""
+        return self._stream is not None
+
+    def _callback(self, outdata, frames, time_info, status):
+        filled = self.ring.read_into(outdata)
+        if filled < len(outdata):
+            # Underrun (network slower than playback) or end of speech: pad with silence.
+            outdata[filled:] = self._silence[:len(outdata) - filled]
+
+    def _ensure_stream(self):
+        with self._lock:
+            if self._stream is None:
+                self._stream = sd.RawOutputStream(
+                    samplerate=self.sample_rate, channels=1, dtype='int16', callback=self._callback
+                )
+                self._stream.start()
+
+    def feed(self, chunks, epoch):
+        """Writes PCM chunks into the ring as they arrive. Returns False if playback was cancelled."""
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                self._ensure_stream()
+                if not self.ring.write(chunk, epoch):
+                    return False
+            return True
+        finally:
+            self.ring.end_clip()
+
+    def drain(self, epoch):
+        """Waits for queued audio to finish playing, then closes the output stream."""
+        self.ring.wait_empty(epoch)
+        if self.ring.epoch == epoch:
+            # The callback has taken the last bytes; give the device time to play them out.
+            with self._lock:
+                stream = self._stream
+            if stream is not None:
+                sd.sleep(int(stream.latency * 1000) + 50)
+            self.close()
+
+    def cancel(self):
+        """Stops playback immediately and invalidates every in-flight feed()."""
+        self.ring.cancel()
+        self.close()
+
+    def close(self):
+        with self._lock:
+            stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.abort()
+            stream.close()
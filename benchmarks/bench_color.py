@@ -0,0 +1,46 @@
+# benchmarks/bench_color.py (Micro-benchmark for color_module.extract_color)
+"""
+Times dominant-color extraction for typical bbox sizes on a 1080p frame.
+
+    python benchmarks/bench_color.py [--iterations 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from color_module import extract_color  # noqa: E402
+
+BBOX_SIZES = {
+    "small (100x100)": [200, 200, 300, 300],
+    "medium (300x400)": [400, 200, 700, 600],
+    "large (640x720)": [600, 180, 1240, 900],
+    "full frame (1920x1080)": [0, 0, 1920, 1080],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, size=(1080, 1920, 3), dtype=np.uint8)
+
+    print(f"{'bbox':<26}{'mean (us)':>12}{'worst (us)':>12}")
+    for name, bbox in BBOX_SIZES.items():
+        extract_color(frame, bbox)  # warm-up
+        timings = np.empty(args.iterations)
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            extract_color(frame, bbox)
+            timings[i] = time.perf_counter() - start
+        print(f"{name:<26}{timings.mean() * 1e6:>12.1f}{timings.max() * 1e6:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
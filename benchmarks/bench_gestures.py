@@ -0,0 +1,131 @@
+# benchmarks/bench_gestures.py (Micro-benchmark for gesture_module.GestureRecognizer)
+"""
+Replays synthetic hand tracks (MediaPipe-shaped landmarks with jitter) through the gesture
+recognizer: checks what each scenario fires and times one update against the frame budget.
+
+    python benchmarks/bench_gestures.py [--fps 30] [--noise 0.004] [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gesture_module import GestureRecognizer  # noqa: E402
+
+# Hand shapes in palm sizes relative to the wrist (x right, y down), indexed like MediaPipe:
+# wrist, thumb (1-4), then index, middle, ring, pinky (knuckle, middle joint, top joint, tip)
+_KNUCKLES_X = (-0.3, -0.1, 0.1, 0.28)
+_THUMB = {
+    'open': [(-0.3, -0.3), (-0.55, -0.5), (-0.8, -0.65), (-1.05, -0.75)],
+    'up': [(-0.3, -0.4), (-0.45, -1.0), (-0.5, -1.5), (-0.5, -1.9)],
+    'tucked': [(-0.25, -0.35), (-0.35, -0.6), (-0.3, -0.8), (-0.2, -0.9)],
+}
+_FINGER = {
+    'extended': [(0, -1.0), (0, -1.4), (0, -1.7), (0, -1.95)],
+    'curled': [(0, -1.0), (0.05, -1.25), (0.05, -1.05), (0.05, -0.85)],
+}
+POSES = {
+    'open_palm': ('open', 'extended'),
+    'thumbs_up': ('up', 'curled'),
+    'fist': ('tucked', 'curled'),
+}
+
+
+def hand_shape(pose):
+    thumb, finger = POSES[pose]
+    points = [(0.0, 0.0)] + _THUMB[thumb]
+    for x in _KNUCKLES_X:
+        points += [(x + dx, dy) for dx, dy in _FINGER[finger]]
+    return np.array(points)
+
+
+SHAPES = {pose: hand_shape(pose) for pose in POSES}
+
+
+def to_mediapipe(points):
+    """Wraps a (21, 2) array like a MediaPipe NormalizedLandmarkList (so conversion is timed too)."""
+    return SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y), z=0.0) for x, y in points])
+
+
+def track(segments, rng, noise, palm=0.12):
+    """
+    Builds a list of hands (or None) from (pose, frames, start_x, end_x) segments: the wrist moves
+    linearly from start_x to end_x at y=0.75; pose None means no hand in the frame.
+    """
+    frames = []
+    for pose, count, start_x, end_x in segments:
+        for x in np.linspace(start_x, end_x, count):
+            if pose is None:
+                frames.append(None)
+                continue
+            points = np.array([x, 0.75]) + SHAPES[pose] * palm
+            frames.append(to_mediapipe(points + rng.normal(0, noise, points.shape)))
+    return frames
+
+
+def scenarios(rng, noise, fps):
+    def n(seconds):
+        return max(1, round(seconds * fps))
+
+    return {
+        # (expected gestures, track)
+        'idle fist': ([], track([('fist', n(3), 0.5, 0.5)], rng, noise)),
+        'no hand': ([], track([(None, n(2), 0, 0)], rng, noise)),
+        'thumbs-up held 1 s': (['thumbs_up'], track([('fist', n(0.5), 0.5, 0.5), ('thumbs_up', n(1), 0.5, 0.5),
+                                                     ('fist', n(0.5), 0.5, 0.5)], rng, noise)),
+        'thumbs-up twice': (['thumbs_up', 'thumbs_up'], track([('thumbs_up', n(0.7), 0.5, 0.5), ('fist', n(0.3), 0.5, 0.5),
+                                                                ('thumbs_up', n(0.7), 0.5, 0.5)], rng, noise)),
+        'thumbs-up flicker (2 frames)': ([], track([('fist', 10, 0.5, 0.5), ('thumbs_up', 2, 0.5, 0.5),
+                                                    ('fist', 10, 0.5, 0.5)] * 3, rng, noise)),
+        'open palm held 2 s': (['open_palm'], track([('open_palm', n(2), 0.5, 0.5)], rng, noise)),
+        'hand raised 0.5 s': ([], track([('open_palm', n(0.5), 0.5, 0.5), (None, n(0.3), 0, 0)], rng, noise)),
+        'wave': ([], track([('open_palm', n(0.27), 0.45, 0.55), ('open_palm', n(0.27), 0.55, 0.45)] * 4, rng, noise)),
+        'swipe right': (['swipe_right'], track([('open_palm', n(0.33), 0.2, 0.75)], rng, noise)),
+        'swipe left': (['swipe_left'], track([('open_palm', n(0.33), 0.8, 0.25)], rng, noise)),
+        'slow drift (3 s)': ([], track([('fist', n(3), 0.3, 0.6)], rng, noise)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fps', type=float, default=30.0, help="Inference rate the tracks are replayed at.")
+    parser.add_argument('--noise', type=float, default=0.004, help="Landmark jitter (std dev, normalized units).")
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    step = 1 / args.fps
+
+    print(f"{'scenario':<30}{'expected':<28}{'fired':<28}")
+    failures = 0
+    for name, (expected, frames) in scenarios(rng, args.noise, args.fps).items():
+        recognizer = GestureRecognizer()
+        fired = [g for i, hand in enumerate(frames) if (g := recognizer.update(hand, timestamp=i * step))]
+        failures += fired != expected
+        print(f"{name:<30}{', '.join(expected) or '-':<28}{', '.join(fired) or '-':<28}"
+              f"{'' if fired == expected else 'MISMATCH'}")
+
+    # Cost of one update, cycling through a mix of poses, swipes and empty frames
+    frames = [hand for _, frames in scenarios(rng, args.noise, args.fps).values() for hand in frames]
+    recognizer = GestureRecognizer()
+    timings = np.empty(args.iterations)
+    for i in range(args.iterations):
+        hand = frames[i % len(frames)]
+        start = time.perf_counter()
+        recognizer.update(hand, timestamp=i * step)
+        timings[i] = time.perf_counter() - start
+    budget_us = 1e6 / args.fps
+    print()
+    print(f"update: mean {timings.mean() * 1e6:.1f} us, p99 {np.percentile(timings, 99) * 1e6:.1f} us, "
+          f"worst {timings.max() * 1e6:.1f} us")
+    print(f"= {timings.mean() * 1e6 / budget_us * 100:.3f}% of the {budget_us / 1000:.1f} ms frame budget at {args.fps:g} FPS")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# benchmarks/bench_outfits.py (Micro-benchmark for outfit_engine.OutfitEngine)
+"""
+Times index builds and top-k outfit enumeration for synthetic wardrobes of growing size.
+
+    python benchmarks/bench_outfits.py [--iterations 200] [--top-k 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from outfit_engine import COLOR_NAMES, OCCASION_STYLES, OutfitEngine  # noqa: E402
+from wardrobe_db import LABEL_CATEGORIES  # noqa: E402
+
+WARDROBE_SIZES = (10, 100, 1000, 10000, 100000)
+
+
+def synthetic_classes(size, rng):
+    """(label, color, count) tuples for 'size' random items, grouped like the wardrobe cache does."""
+    labels = [label for labels in LABEL_CATEGORIES.values() for label in labels] + ['person', 'tv']
+    counts = Counter((rng.choice(labels), rng.choice(COLOR_NAMES)) for _ in range(size))
+    return [(label, color, count) for (label, color), count in counts.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    occasions = [None] + list(OCCASION_STYLES)
+
+    print(f"{'items':>8}{'classes':>9}{'index (ms)':>12}{'mean (ms)':>11}{'worst (ms)':>12}")
+    for size in WARDROBE_SIZES:
+        classes = synthetic_classes(size, rng)
+        engine = OutfitEngine()
+        start = time.perf_counter()
+        engine.update(size, classes)
+        index_ms = (time.perf_counter() - start) * 1e3
+
+        timings = np.empty(args.iterations)
+        for i in range(args.iterations):
+            start = time.perf_counter()
+            engine.recommend(occasions[i % len(occasions)], top_k=args.top_k)
+            timings[i] = time.perf_counter() - start
+        print(f"{size:>8}{len(classes):>9}{index_ms:>12.2f}{timings.mean() * 1e3:>11.2f}{timings.max() * 1e3:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
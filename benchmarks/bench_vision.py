@@ -0,0 +1,132 @@
+# benchmarks/bench_vision.py (Frame-replay benchmark for VisionProcessor)
+"""
+Replays recorded or synthetic frames through VisionProcessor and reports time per frame:
+
+1. process_frame on BGR arrays, at native and at reduced inference resolution.
+2. The WebRTC recv path on yuv420p PyAV frames paced at --fps (skipped if PyAV is missing):
+   the original to_ndarray/cvtColor/native-inference/from_ndarray path versus
+   process_video_frame (latest-frame worker, small rgb24 from PyAV, pass-through).
+
+CPU time counts every thread, so the worker's inference is included.
+
+    python benchmarks/bench_vision.py [--video clip.mp4] [--resolution 1280x720] [--frames 120]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vision_module import INFERENCE_WIDTH, VisionProcessor  # noqa: E402
+
+
+def synthetic_frames(width, height, count):
+    """Smooth gradient background with a moving bright blob; cheap to generate and replay."""
+    ys, xs = np.mgrid[0:height, 0:width]
+    base = np.stack([xs * 255 // width, ys * 255 // height, np.full_like(xs, 96)], axis=-1).astype(np.uint8)
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        cx = int((i / max(count - 1, 1)) * (width - 200)) + 100
+        frame[height // 3:height // 3 + 160, cx - 80:cx + 80] = (200, 180, 160)
+        frames.append(frame)
+    return frames
+
+
+def video_frames(path, count):
+    import cv2
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise SystemExit(f"Could not read any frames from {path}")
+    return frames
+
+
+def replay(frames, inference_width):
+    processor = VisionProcessor(inference_width=inference_width)
+    processor.process_frame(frames[0].copy())  # warm-up (graph init, buffer allocation)
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for frame in frames:
+        processor.process_frame(frame)
+    wall = (time.perf_counter() - wall_start) / len(frames)
+    cpu = (time.process_time() - cpu_start) / len(frames)
+    processor.hands.close()
+    return wall * 1000, cpu * 1000
+
+
+def replay_recv(frames, fps, mode, inference_width):
+    """Paces PyAV frames at 'fps' through the old or new recv path; returns (recv p50 ms, recv p95 ms, cpu ms/frame)."""
+    import av
+
+    video_frames = [av.VideoFrame.from_ndarray(frame, format="bgr24").reformat(format="yuv420p") for frame in frames]
+    processor = VisionProcessor(inference_width=inference_width)
+    processor.process_frame(frames[0].copy())  # warm-up
+
+    def old_recv(frame):
+        img = frame.to_ndarray(format="bgr24")
+        return av.VideoFrame.from_ndarray(processor.process_frame(img), format="bgr24")
+
+    recv = old_recv if mode == "before" else processor.process_video_frame
+    interval = 1.0 / fps
+    latencies = []
+    cpu_start = time.process_time()
+    next_due = time.perf_counter()
+    for frame in video_frames:
+        start = time.perf_counter()
+        recv(frame)
+        latencies.append(time.perf_counter() - start)
+        next_due += interval
+        time.sleep(max(0.0, next_due - time.perf_counter()))
+    cpu = (time.process_time() - cpu_start) / len(video_frames)
+    processor.stop_worker()
+    processor.hands.close()
+    latencies = np.array(latencies) * 1000
+    return np.percentile(latencies, 50), np.percentile(latencies, 95), cpu * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--video', help="Recorded clip to replay instead of synthetic frames.")
+    parser.add_argument('--resolution', default='1280x720', help="Synthetic frame size, e.g. 1920x1080.")
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--inference-width', type=int, default=INFERENCE_WIDTH)
+    parser.add_argument('--fps', type=float, default=30.0, help="Pacing for the recv-path replay.")
+    args = parser.parse_args()
+
+    if args.video:
+        frames = video_frames(args.video, args.frames)
+    else:
+        width, height = (int(v) for v in args.resolution.lower().split('x'))
+        frames = synthetic_frames(width, height, args.frames)
+
+    height, width = frames[0].shape[:2]
+    print(f"Replaying {len(frames)} frames at {width}x{height}")
+    print(f"{'mode':<28}{'wall ms/frame':>15}{'cpu ms/frame':>15}")
+    for name, inference_width in (("native resolution", None), (f"inference width {args.inference_width}", args.inference_width)):
+        wall, cpu = replay(frames, inference_width)
+        print(f"{name:<28}{wall:>15.2f}{cpu:>15.2f}")
+
+    try:
+        import av  # noqa: F401
+    except ImportError:
+        print("PyAV not installed; skipping the recv-path replay.")
+        return
+    print(f"\nWebRTC recv path at {args.fps:g} fps")
+    print(f"{'mode':<28}{'recv p50 ms':>13}{'recv p95 ms':>13}{'cpu ms/frame':>15}")
+    for name, mode, inference_width in (("before (sync, native)", "before", None),
+                                        ("after (worker, reduced)", "after", args.inference_width)):
+        p50, p95, cpu = replay_recv(frames, args.fps, mode, inference_width)
+        print(f"{name:<28}{p50:>13.2f}{p95:>13.2f}{cpu:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
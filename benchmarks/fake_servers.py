@@ -0,0 +1,227 @@
+# benchmarks/fake_servers.py (Local stand-ins for the Gemini and ElevenLabs HTTP APIs)
+"""
+Minimal HTTP servers speaking just enough of the Gemini (generateContent / streamGenerateContent)
+and ElevenLabs (text-to-speech, plain and streamed) APIs for the real client libraries to talk to
+them. Latency and streaming behaviour are configurable, so benchmarks run with no network or keys.
+
+Point the app at them with MIRA_GEMINI_BASE_URL / MIRA_ELEVEN_BASE_URL, or run standalone:
+
+    python benchmarks/fake_servers.py [--latency-ms 300] [--chunk-delay-ms 40]
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_ANSWER = (
+    "That navy look is a great base for the evening. The white shirt keeps it crisp and the contrast "
+    "with the navy is classic. Try swapping in black loafers to dress it up. A silver watch would "
+    "finish it nicely. If it's chilly, a beige coat adds warmth without fighting the colors."
+)
+PCM_SAMPLE_RATE = 22050
+SPOKEN_CHARS_PER_SECOND = 15  # how much fake audio a piece of text turns into
+
+
+class FakeAPIConfig:
+    """Behaviour shared by both fake servers; fields can be changed while they run."""
+
+    def __init__(self, latency_ms=300.0, chunk_delay_ms=40.0, chunks=8, answer=FAKE_ANSWER,
+                 audio_chunk_bytes=4096, audio_realtime_factor=4.0, error_rate=0.0):
+        self.latency_ms = latency_ms                  # before the first byte of any response
+        self.chunk_delay_ms = chunk_delay_ms          # between streamed Gemini chunks
+        self.chunks = chunks                          # Gemini answer split into this many chunks
+        self.answer = answer
+        self.audio_chunk_bytes = audio_chunk_bytes
+        self.audio_realtime_factor = audio_realtime_factor  # audio generated this many times faster than real time
+        self.error_rate = error_rate                  # fraction of requests answered with HTTP 503
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def next_request(self):
+        """Counts a request; True if it should fail (every 1/error_rate-th one)."""
+        with self._lock:
+            self.requests += 1
+            return self.error_rate > 0 and self.requests % max(1, round(1 / self.error_rate)) == 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = None  # set per server class
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            return {}
+
+    def _send(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the client hung up mid-stream (e.g. cancelled speech)
+
+    def _fail_or_wait(self):
+        """Sleeps the configured latency; answers 503 and returns True for injected errors."""
+        failing = self.config.next_request()
+        time.sleep(self.config.latency_ms / 1000)
+        if failing:
+            self._send(503, json.dumps({'error': {'code': 503, 'message': 'Injected failure'}}).encode())
+        return failing
+
+
+class GeminiHandler(_Handler):
+    _PATH = re.compile(r'/v1\w*/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)')
+
+    def do_POST(self):
+        match = self._PATH.match(self.path)
+        if not match:
+            self._send(404, b'{}')
+            return
+        request = self._read_json()
+        if self._fail_or_wait():
+            return
+        prompt_tokens = len(json.dumps(request.get('contents', []))) // 4
+
+        answer = self.config.answer
+        if match.group('method') == 'generateContent':
+            self._send(200, json.dumps(self._response(answer, prompt_tokens)).encode())
+            return
+
+        # Server-sent events, one JSON response per chunk
+        self._start_chunked('text/event-stream')
+        size = max(1, -(-len(answer) // self.config.chunks))
+        for start in range(0, len(answer), size):
+            if start:
+                time.sleep(self.config.chunk_delay_ms / 1000)
+            event = json.dumps(self._response(answer[start:start + size], prompt_tokens))
+            self._write_chunk(f"data: {event}\r\n\r\n".encode())
+        self._end_chunked()
+
+    @staticmethod
+    def _response(text, prompt_tokens):
+        return {
+            'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP', 'index': 0}],
+            'usageMetadata': {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': len(text) // 4,
+                              'totalTokenCount': prompt_tokens + len(text) // 4},
+        }
+
+
+class ElevenLabsHandler(_Handler):
+    _PATH = re.compile(r'/v1/text-to-speech/(?P<voice>[^/?]+)(?P<stream>/stream)?(\?|$)')
+
+    def do_POST(self):
+        match = self._PATH.match(self.path)
+        if not match:
+            self._send(404, b'{}')
+            return
+        request = self._read_json()
+        if self._fail_or_wait():
+            return
+        # Silence-level noise sized like real speech for this text (16-bit mono PCM)
+        seconds = max(0.5, len(request.get('text', '')) / SPOKEN_CHARS_PER_SECOND)
+        audio = bytes(int(seconds * PCM_SAMPLE_RATE) * 2)
+
+        if not match.group('stream'):
+            self._send(200, audio, 'audio/mpeg')
+            return
+
+        self._start_chunked('audio/mpeg')
+        step = self.config.audio_chunk_bytes
+        chunk_seconds = step / 2 / PCM_SAMPLE_RATE / self.config.audio_realtime_factor
+        for start in range(0, len(audio), step):
+            if start:
+                time.sleep(chunk_seconds)
+            self._write_chunk(audio[start:start + step])
+        self._end_chunked()
+
+
+class FakeAPIServer:
+    """Runs one fake API on a background thread at http://127.0.0.1:<port> (port 0 = any free port)."""
+
+    def __init__(self, handler, config=None, port=0):
+        self.config = config or FakeAPIConfig()
+        handler_class = type(handler.__name__, (handler,), {'config': self.config})
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), handler_class)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def fake_gemini(config=None, port=0):
+    return FakeAPIServer(GeminiHandler, config, port)
+
+
+def fake_elevenlabs(config=None, port=0):
+    return FakeAPIServer(ElevenLabsHandler, config, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gemini-port', type=int, default=8701)
+    parser.add_argument('--eleven-port', type=int, default=8702)
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--chunk-delay-ms', type=float, default=40.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeAPIConfig(latency_ms=args.latency_ms, chunk_delay_ms=args.chunk_delay_ms, error_rate=args.error_rate)
+    with fake_gemini(config, args.gemini_port) as gemini, fake_elevenlabs(config, args.eleven_port) as eleven:
+        print(f"MIRA_GEMINI_BASE_URL={gemini.url}")
+        print(f"MIRA_ELEVEN_BASE_URL={eleven.url}")
+        print("Serving until Ctrl+C...")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,480 @@
+# benchmarks/run_suite.py (Offline benchmark and load-test suite, JSON results)
+"""
+Runs every benchmark with no camera, no network and no API keys: Gemini and ElevenLabs are
+replaced by the local servers in fake_servers.py, frames are synthetic (or a recorded clip).
+
+  vision    VisionProcessor.process_frame replay, native vs reduced inference resolution
+  wardrobe  add_item_to_wardrobe / get_wardrobe_summary at 10^2..10^5 items (SQLite and JSON)
+  stylist   AIStylistModule blocking and streamed answers, prompt tokens per turn
+  voice     VoiceModule.speak_response time to first audio (headless audio sink; a null sounddevice
+            and microphone stand in when PortAudio / PyAudio are missing)
+  sessions  N concurrent sessions sending commands through the job scheduler
+
+Sections whose dependencies are missing are reported as skipped. Results are JSON, so runs
+can be compared across commits:
+
+    python benchmarks/run_suite.py --out before.json
+    python benchmarks/run_suite.py --out after.json --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from fake_servers import FakeAPIConfig, fake_elevenlabs, fake_gemini  # noqa: E402
+
+SECTIONS = ('vision', 'wardrobe', 'stylist', 'voice', 'sessions')
+WARDROBE_SIZES = (100, 1000, 10000, 100000)
+COMMANDS = (
+    "What should I wear to a wedding?",
+    "Does this work for the office?",
+    "Give me a casual weekend look",
+    "What goes with my navy blue jeans?",
+    "Something for a dinner date",
+    "What should I wear to the gym?",
+)
+SAMPLE_GARMENTS = (
+    ('shirt', 'white'), ('t-shirt', 'black'), ('blouse', 'pink'), ('jeans', 'navy blue'),
+    ('trousers', 'beige'), ('skirt', 'black'), ('dress', 'red'), ('blazer', 'navy blue'),
+    ('coat', 'beige'), ('sneakers', 'white'), ('loafers', 'brown'), ('heels', 'black'),
+    ('watch', 'gray'), ('handbag', 'brown'), ('tie', 'burgundy'),
+)
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def percentiles(samples_seconds):
+    """p50/p95/p99/mean in milliseconds."""
+    if not samples_seconds:
+        return {}
+    values = np.array(samples_seconds) * 1000
+    return {'p50_ms': round(float(np.percentile(values, 50)), 3), 'p95_ms': round(float(np.percentile(values, 95)), 3),
+            'p99_ms': round(float(np.percentile(values, 99)), 3), 'mean_ms': round(float(values.mean()), 3),
+            'n': len(values)}
+
+
+def skipped(error):
+    return {'skipped': f"{type(error).__name__}: {error}"}
+
+
+@contextlib.contextmanager
+def temporary_wardrobe(kind='sqlite', items=()):
+    """Points wardrobe_db at an empty store in a temp dir for the duration of the block."""
+    import wardrobe_db
+    from wardrobe_storage import create_backend
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'wardrobe.db' if kind == 'sqlite' else 'wardrobe.json')
+        backend = create_backend(kind, path)
+        previous = wardrobe_db.set_backend(backend)
+        with contextlib.redirect_stdout(io.StringIO()):
+            wardrobe_db.save_wardrobe(list(items))  # also resets the aggregates and the dedup window
+        try:
+            yield backend
+        finally:
+            wardrobe_db.set_backend(previous)
+            backend.close()
+
+
+def garment_items():
+    return [{'label': label, 'color': color, 'confidence': 0.9, 'bbox': [0, 0, 10, 10]}
+            for label, color in SAMPLE_GARMENTS]
+
+
+class StaticStatus:
+    """Stands in for VisionProcessor where only the live status is needed."""
+
+    def get_live_detections(self):
+        return "Hand detected."
+
+
+# --- vision ---
+
+def bench_vision(args):
+    from bench_vision import replay, synthetic_frames, video_frames
+    from vision_module import INFERENCE_WIDTH
+
+    if args.video:
+        frames = video_frames(args.video, args.frames)
+    else:
+        width, height = (int(v) for v in args.resolution.lower().split('x'))
+        frames = synthetic_frames(width, height, args.frames)
+    height, width = frames[0].shape[:2]
+    result = {'frames': len(frames), 'resolution': f"{width}x{height}"}
+    for name, inference_width in (('native', None), ('reduced', INFERENCE_WIDTH)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            wall, cpu = replay(frames, inference_width)
+        result[name] = {'wall_ms_per_frame': round(wall, 3), 'cpu_ms_per_frame': round(cpu, 3)}
+    return result
+
+
+# --- wardrobe ---
+
+def _fill_wardrobe(size, rng):
+    """Adds 'size' distinct items (non-overlapping boxes, so none are merged); returns per-add times."""
+    import wardrobe_db
+
+    labels = [label for label, _ in SAMPLE_GARMENTS]
+    colors = [color for _, color in SAMPLE_GARMENTS]
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(size):
+            x, y = (i % 1000) * 50, (i // 1000) * 50
+            item = {'label': rng.choice(labels), 'color': rng.choice(colors), 'confidence': 0.9,
+                    'bbox': [x, y, x + 40, y + 40]}
+            start = time.perf_counter()
+            wardrobe_db.add_item_to_wardrobe(item)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_wardrobe(args):
+    import wardrobe_db
+
+    rng = random.Random(0)
+    results = {}
+    for kind, max_size in (('sqlite', args.max_items), ('json', args.json_max_items)):
+        for size in (s for s in WARDROBE_SIZES if s <= max_size):
+            log(f"  wardrobe {kind}: {size} items")
+            with temporary_wardrobe(kind) as backend:
+                adds = _fill_wardrobe(size, rng)
+                start = time.perf_counter()
+                wardrobe_db.get_wardrobe_summary()
+                warm = time.perf_counter() - start
+                start = time.perf_counter()
+                wardrobe_db.WardrobeCache().summary(backend)  # what another process pays on first read
+                cold = time.perf_counter() - start
+            results[f"{kind}_{size}"] = {'add': percentiles(adds), 'add_total_s': round(sum(adds), 3),
+                                         'summary_warm_ms': round(warm * 1000, 3),
+                                         'summary_cold_ms': round(cold * 1000, 3)}
+    return results
+
+
+# --- stylist ---
+
+def make_stylist(gemini_url, client=None):
+    from google import genai
+    from google.genai import types
+    from ai_stylist_module import AIStylistModule
+    from response_cache import ResponseCache
+
+    client = client or genai.Client(api_key='fake', http_options=types.HttpOptions(base_url=gemini_url))
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Nothing cached: every command goes to the (fake) API
+        return AIStylistModule(StaticStatus(), client=client, response_cache=ResponseCache(max_entries=0, path=None))
+
+
+def bench_stylist(args, gemini_url):
+    with temporary_wardrobe('sqlite', garment_items()):
+        stylist = make_stylist(gemini_url)
+        blocking = []
+        for i in range(args.turns):
+            start = time.perf_counter()
+            stylist.generate_outfit_suggestion(COMMANDS[i % len(COMMANDS)])
+            blocking.append(time.perf_counter() - start)
+
+        first_sentence, full = [], []
+        for i in range(args.turns):
+            start = time.perf_counter()
+            for n, _ in enumerate(stylist.stream_outfit_suggestion(COMMANDS[i % len(COMMANDS)])):
+                if n == 0:
+                    first_sentence.append(time.perf_counter() - start)
+            full.append(time.perf_counter() - start)
+
+    return {'generate': percentiles(blocking), 'stream_first_sentence': percentiles(first_sentence),
+            'stream_full': percentiles(full),
+            'prompt_tokens_per_turn': [stats['prompt_tokens'] for stats in stylist.prompt_token_stats()]}
+
+
+# --- voice ---
+
+class NullOutputStream:
+    """sounddevice stream stand-in for boxes without PortAudio (the headless player never plays through it)."""
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def start(self):
+        pass
+
+    def abort(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullMicrophone:
+    """speech_recognition.Microphone stand-in for boxes without PyAudio (the benchmark never listens)."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+def install_headless_audio():
+    """
+    Lets voice_module import and run with no audio hardware libraries: a null 'sounddevice' module
+    if PortAudio is missing, and a null microphone if PyAudio is. Must run before voice_module is
+    imported. Returns the names of what was replaced.
+    """
+    replaced = []
+    try:
+        import sounddevice  # noqa: F401
+    except (ImportError, OSError):
+        null_sd = types.ModuleType('sounddevice')
+        null_sd.RawOutputStream = null_sd.RawInputStream = NullOutputStream
+        null_sd.sleep = lambda ms: time.sleep(ms / 1000)
+        null_sd.play = null_sd.stop = null_sd.wait = lambda *args, **kwargs: None
+        sys.modules['sounddevice'] = null_sd
+        replaced.append('sounddevice')
+
+    import speech_recognition as sr
+    try:
+        sr.Microphone.get_pyaudio()
+    except AttributeError:  # speech_recognition reports a missing PyAudio this way
+        sr.Microphone = NullMicrophone
+        replaced.append('microphone')
+    return replaced
+
+
+def make_headless_player_class():
+    """A StreamingAudioPlayer whose 'device' is a thread consuming the ring buffer in real time."""
+    from audio_stream import StreamingAudioPlayer
+
+    class HeadlessStream:
+        latency = 0.0
+
+        def __init__(self, player):
+            self.player = player
+            self.stopped = threading.Event()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+
+        def run(self):
+            block = bytearray(1024)
+            seconds = len(block) / 2 / self.player.sample_rate
+            while not self.stopped.is_set():
+                if self.player.ring.read_into(block) and self.player.first_audio_at is None:
+                    self.player.first_audio_at = time.perf_counter()
+                time.sleep(seconds)
+
+        def start(self):
+            self.thread.start()
+
+        def abort(self):
+            self.stopped.set()
+
+        def close(self):
+            pass
+
+    class HeadlessPlayer(StreamingAudioPlayer):
+        first_audio_at = None
+
+        def _ensure_stream(self):
+            with self._lock:
+                if self._stream is None:
+                    self._stream = HeadlessStream(self)
+                    self._stream.start()
+
+    return HeadlessPlayer
+
+
+def bench_voice(args):
+    replaced = install_headless_audio()
+    if replaced:
+        log(f"  no audio libraries, using null stand-ins for: {', '.join(replaced)}")
+    import voice_module
+    from tts_cache import TTSCache
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        voice = voice_module.VoiceModule(eleven_api_key='fake')
+    if not voice_module.TTS_STREAMING:
+        return {'skipped': "MIRA_TTS_STREAMING=0 (the MP3 path needs ffmpeg and an audio device)"}
+    voice.player = make_headless_player_class()(voice_module.TTS_SAMPLE_RATE)
+
+    results = {'null_audio': replaced}
+    with tempfile.TemporaryDirectory() as directory:
+        voice.tts_cache = TTSCache(directory)
+        sentences = [f"Sentence number {i}: try the white shirt with navy jeans." for i in range(args.turns)]
+        for label, texts in (('cache_miss', sentences), ('cache_hit', sentences)):
+            if label == 'cache_hit':
+                voice.prewarm(texts)  # the miss pass cancels each sentence before it is cached
+            first_audio = []
+            for text in texts:
+                voice.player.first_audio_at = None
+                start = time.perf_counter()
+                voice.speak_response(text)
+                while voice.player.first_audio_at is None and time.perf_counter() - start < 10:
+                    time.sleep(0.001)
+                if voice.player.first_audio_at is not None:
+                    first_audio.append(voice.player.first_audio_at - start)
+                voice.cancel_speech()
+                time.sleep(0.05)  # let the speech thread drop the cancelled sentence
+            results[f"first_audio_{label}"] = percentiles(first_audio)
+        results['tts_cache'] = voice.tts_cache.stats()
+    return results
+
+
+# --- concurrent sessions ---
+
+def bench_sessions(args, gemini_url):
+    from google import genai
+    from google.genai import types
+    from job_scheduler import JobScheduler
+
+    client = genai.Client(api_key='fake', http_options=types.HttpOptions(base_url=gemini_url))
+    scheduler = JobScheduler()
+    latencies = []
+    latencies_lock = threading.Lock()
+    rejected = [0]
+
+    def command_job(token, stylist, command, submitted_at, done):
+        for _ in stylist.stream_outfit_suggestion(command, cancel_token=token):
+            if token.cancelled:
+                break
+        with latencies_lock:
+            latencies.append(time.perf_counter() - submitted_at)
+        done.set()
+
+    def session(index):
+        rng = random.Random(index)
+        stylist = make_stylist(gemini_url, client)
+        for turn in range(args.session_commands):
+            time.sleep(rng.uniform(0, args.think_time))
+            done = threading.Event()
+            command = COMMANDS[(index + turn) % len(COMMANDS)]
+            job = scheduler.submit(f"session-{index}", 'command', command_job, stylist, command,
+                                   time.perf_counter(), done)
+            if job is None:
+                with latencies_lock:
+                    rejected[0] += 1
+                continue
+            done.wait(timeout=60)
+
+    with temporary_wardrobe('sqlite', garment_items()):
+        start = time.perf_counter()
+        threads = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    stats = scheduler.stats()
+    scheduler.shutdown()
+    return {'sessions': args.sessions, 'commands': len(latencies), 'rejected': rejected[0],
+            'throughput_per_s': round(len(latencies) / elapsed, 2), 'command_latency': percentiles(latencies),
+            'scheduler': {key: round(value, 3) if isinstance(value, float) else value for key, value in stats.items()}}
+
+
+# --- results ---
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(data, prefix=''):
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(current, previous_path):
+    """Prints every numeric result next to the previous run's value."""
+    with open(previous_path) as f:
+        previous = dict(flatten(json.load(f)['results']))
+    log(f"\n{'metric':<60}{'before':>12}{'after':>12}{'change':>9}")
+    for name, value in flatten(current['results']):
+        if name in previous:
+            before = previous[name]
+            change = f"{(value - before) / before * 100:+.1f}%" if before else ''
+            log(f"{name:<60}{before:>12.3f}{value:>12.3f}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', default=','.join(SECTIONS), help="Comma-separated sections to run.")
+    parser.add_argument('--out', help="Write the JSON results here (default: stdout).")
+    parser.add_argument('--compare', help="Previous results file to compare against.")
+    parser.add_argument('--video', help="Recorded clip for the vision replay instead of synthetic frames.")
+    parser.add_argument('--resolution', default='1280x720')
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--max-items', type=int, default=100000, help="Largest SQLite wardrobe size.")
+    parser.add_argument('--json-max-items', type=int, default=1000,
+                        help="Largest JSON wardrobe size (each add rewrites the file).")
+    parser.add_argument('--turns', type=int, default=10, help="Commands / sentences per stylist and voice run.")
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--session-commands', type=int, default=5)
+    parser.add_argument('--think-time', type=float, default=0.5, help="Max seconds between a session's commands.")
+    parser.add_argument('--latency-ms', type=float, default=300.0, help="Fake API time to first byte.")
+    parser.add_argument('--chunk-delay-ms', type=float, default=40.0, help="Fake Gemini delay between chunks.")
+    args = parser.parse_args()
+    sections = [name.strip() for name in args.only.split(',') if name.strip()]
+
+    config = FakeAPIConfig(latency_ms=args.latency_ms, chunk_delay_ms=args.chunk_delay_ms)
+    with fake_gemini(config) as gemini, fake_elevenlabs(config) as eleven:
+        # Read by resource_registry at import time, so set before any app module is imported
+        os.environ['MIRA_GEMINI_BASE_URL'] = gemini.url
+        os.environ['MIRA_ELEVEN_BASE_URL'] = eleven.url
+
+        runners = {
+            'vision': lambda: bench_vision(args),
+            'wardrobe': lambda: bench_wardrobe(args),
+            'stylist': lambda: bench_stylist(args, gemini.url),
+            'voice': lambda: bench_voice(args),
+            'sessions': lambda: bench_sessions(args, gemini.url),
+        }
+        results = {}
+        # App modules (and their background threads) print freely; keep stdout for the JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            for name in sections:
+                log(f"Running {name}...")
+                try:
+                    results[name] = runners[name]()
+                except (ImportError, OSError) as e:  # missing package, or e.g. no PortAudio library
+                    results[name] = skipped(e)
+                    log(f"  skipped: {e}")
+
+    report = {
+        'meta': {'commit': git_commit(), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'cpu_count': os.cpu_count(), 'fake_api': {'latency_ms': args.latency_ms,
+                                                            'chunk_delay_ms': args.chunk_delay_ms}},
+        'results': results,
+    }
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(payload)
+        log(f"Results written to {args.out}")
+    else:
+        print(payload)
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
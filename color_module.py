@@ -0,0 +1,106 @@
+# color_module.py (Vectorized dominant-color extraction for detected items)
+import numpy as np
+
+# Named palette the wardrobe uses, as RGB reference values.
+PALETTE_RGB = {
+    "black": (20, 20, 20),
+    "white": (245, 245, 245),
+    "gray": (128, 128, 128),
+    "beige": (222, 203, 170),
+    "khaki": (189, 172, 120),
+    "brown": (110, 70, 40),
+    "red": (200, 30, 40),
+    "burgundy": (110, 20, 40),
+    "pink": (240, 150, 180),
+    "orange": (240, 130, 40),
+    "yellow": (240, 210, 50),
+    "olive": (110, 110, 40),
+    "green": (40, 140, 60),
+    "light blue": (150, 190, 230),
+    "blue": (40, 90, 200),
+    "navy blue": (20, 30, 80),
+    "purple": (120, 60, 150),
+}
+PALETTE_NAMES = tuple(PALETTE_RGB)
+
+# Colors that pair with almost anything (used by the styling rules)
+NEUTRAL_COLORS = frozenset({"black", "white", "gray", "beige", "khaki", "navy blue", "brown"})
+
+# Upper bound on pixels inspected per bbox; bigger crops are strided down to roughly this many.
+PIXEL_BUDGET = 1024
+# Fraction trimmed from each side of the bbox so background around the garment is ignored.
+BBOX_INSET = 0.15
+# Bits kept per channel when binning pixels for the lookup table (5 -> 32x32x32 bins).
+_LUT_BITS = 5
+
+
+def rgb_to_lab(rgb):
+    """Converts an (..., 3) array of sRGB values in 0-255 to CIE LAB (D65)."""
+    rgb = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ np.array([
+        [0.4124564, 0.2126729, 0.0193339],
+        [0.3575761, 0.7151522, 0.1191920],
+        [0.1804375, 0.0721750, 0.9503041],
+    ])
+    xyz /= np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 0.008856, np.cbrt(xyz), 7.787 * xyz + 16.0 / 116.0)
+    lab = np.empty_like(f)
+    lab[..., 0] = 116.0 * f[..., 1] - 16.0
+    lab[..., 1] = 500.0 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200.0 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+PALETTE_LAB = rgb_to_lab(np.array([PALETTE_RGB[name] for name in PALETTE_NAMES]))
+
+
+def _build_lookup_table():
+    """
+    Maps every quantized BGR bin to the nearest palette color in LAB space.
+    Built once at import (32k bins), so per-frame work is just indexing and a bincount.
+    """
+    levels = 1 << _LUT_BITS
+    centers = (np.arange(levels) << (8 - _LUT_BITS)) + (1 << (7 - _LUT_BITS))
+    b, g, r = np.meshgrid(centers, centers, centers, indexing='ij')
+    bins_lab = rgb_to_lab(np.stack([r, g, b], axis=-1).reshape(-1, 3))
+    distances = ((bins_lab[:, None, :] - PALETTE_LAB[None, :, :]) ** 2).sum(axis=-1)
+    return distances.argmin(axis=1).astype(np.uint8)
+
+
+_COLOR_LUT = _build_lookup_table()
+
+
+def _crop(frame, bbox):
+    """Returns a strided view of the bbox interior holding at most ~PIXEL_BUDGET pixels (no copy)."""
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = bbox
+    inset_x, inset_y = (x2 - x1) * BBOX_INSET, (y2 - y1) * BBOX_INSET
+    x1, x2 = max(int(x1 + inset_x), 0), min(int(x2 - inset_x), width)
+    y1, y2 = max(int(y1 + inset_y), 0), min(int(y2 - inset_y), height)
+    if x2 <= x1 or y2 <= y1:
+        return None
+    step = max(1, int(np.ceil(np.sqrt((x2 - x1) * (y2 - y1) / PIXEL_BUDGET))))
+    return frame[y1:y2:step, x1:x2:step]
+
+
+def extract_colors(frame, bbox, top_k=3):
+    """
+    Returns up to 'top_k' (color_name, share) pairs for the pixels inside 'bbox' of a BGR frame,
+    most dominant first. Returns [] if the bbox does not overlap the frame.
+    """
+    crop = _crop(frame, bbox)
+    if crop is None or crop.size == 0:
+        return []
+    pixels = crop.reshape(-1, 3).astype(np.uint16) >> (8 - _LUT_BITS)
+    bins = (pixels[:, 0] << (2 * _LUT_BITS)) | (pixels[:, 1] << _LUT_BITS) | pixels[:, 2]
+    counts = np.bincount(_COLOR_LUT[bins], minlength=len(PALETTE_NAMES))
+    total = counts.sum()
+    ranked = np.argsort(counts)[::-1][:top_k]
+    return [(PALETTE_NAMES[index], float(counts[index] / total)) for index in ranked if counts[index]]
+
+
+def extract_color(frame, bbox):
+    """Returns the name of the dominant color inside 'bbox' of a BGR frame ('unknown' if it cannot tell)."""
+    colors = extract_colors(frame, bbox, top_k=1)
+    return colors[0][0] if colors else "unknown"
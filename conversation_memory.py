@@ -0,0 +1,141 @@
+# conversation_memory.py (Token-budgeted chat history for the stylist)
+import os
+import re
+
+# --- Configuration ---
+# Recent turns are kept verbatim up to this many (estimated) tokens...
+HISTORY_TOKEN_BUDGET = int(os.getenv('MIRA_HISTORY_TOKENS', '1500'))
+# ...older ones are collapsed into a rolling summary capped at this many.
+SUMMARY_TOKEN_BUDGET = int(os.getenv('MIRA_SUMMARY_TOKENS', '300'))
+# Rough English average; only used to decide when to collapse, real counts come from the API.
+CHARS_PER_TOKEN = 4
+
+_FIRST_SENTENCE = re.compile(r'(.+?[.!?])(\s|$)', re.S)
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def _first_sentence(text, limit=160):
+    text = ' '.join(text.split())
+    match = _FIRST_SENTENCE.match(text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= limit else sentence[:limit - 3].rstrip() + '...'
+
+
+class ConversationMemory:
+    """
+    Keeps the conversation under a token budget: the newest turns verbatim, older turns
+    folded into a short rolling summary. Also decides how the wardrobe is sent each turn:
+    in full, as a delta against the last turn, or as "unchanged".
+    """
+
+    def __init__(self, history_budget=HISTORY_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET):
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.turns = []          # dicts: id, user, model, tokens
+        self.summary_lines = []  # rolling summary of collapsed turns, oldest first
+        self.turn_stats = []     # per-turn prompt size, see record_turn
+        self._next_turn_id = 0
+        # Wardrobe as the model last saw it
+        self._wardrobe_version = None
+        self._wardrobe_labels = None
+        self._wardrobe_anchor = None  # id of the turn that carried the full wardrobe block
+
+    # --- Wardrobe block ---
+
+    def wardrobe_block(self, summary, labels, version):
+        """
+        Returns (text, state) for the wardrobe part of the next message. The full summary is only
+        sent when the model has not seen it yet (or the turn that had it was collapsed); otherwise
+        a delta or "unchanged". Pass 'state' to record_turn once the model has actually answered.
+        """
+        anchor_in_history = any(turn['id'] == self._wardrobe_anchor for turn in self.turns)
+        state = {'version': version, 'labels': dict(labels), 'anchor': self._wardrobe_anchor}
+        if anchor_in_history and version == self._wardrobe_version:
+            return "Unchanged since the last message.", state
+
+        delta = self._wardrobe_delta(labels) if anchor_in_history else None
+        if delta is not None and estimate_tokens(delta) < estimate_tokens(summary):
+            return delta, state
+        state['anchor'] = self._next_turn_id
+        return summary, state
+
+    def _wardrobe_delta(self, labels):
+        if self._wardrobe_labels is None:
+            return None
+        changes = []
+        for label in list(self._wardrobe_labels) + [l for l in labels if l not in self._wardrobe_labels]:
+            diff = labels.get(label, 0) - self._wardrobe_labels.get(label, 0)
+            if diff:
+                changes.append(f"{'+' if diff > 0 else '-'}{abs(diff)} x {label}")
+        if not changes:
+            return "Unchanged since the last message."
+        return "Changes since the last message:\n" + "\n".join(f"- {change}" for change in changes)
+
+    # --- History ---
+
+    def build_contents(self, message):
+        """Returns the request contents: rolling summary, recent turns, then the new user message."""
+        contents = []
+        if self.summary_lines:
+            contents.append({'role': 'user', 'parts': [{'text': "Summary of our earlier conversation:\n" + "\n".join(self.summary_lines)}]})
+            contents.append({'role': 'model', 'parts': [{'text': "Got it, I remember."}]})
+        for turn in self.turns:
+            contents.append({'role': 'user', 'parts': [{'text': turn['user']}]})
+            contents.append({'role': 'model', 'parts': [{'text': turn['model']}]})
+        contents.append({'role': 'user', 'parts': [{'text': message}]})
+        return contents
+
+    def history_tokens(self):
+        return sum(turn['tokens'] for turn in self.turns)
+
+    def summary_tokens(self):
+        return estimate_tokens("\n".join(self.summary_lines))
+
+    def record_turn(self, message, answer, prompt_tokens=None, wardrobe_state=None, history_message=None):
+        """
+        Stores a finished turn and collapses old turns if over budget.
+        'prompt_tokens' is the API's count for the request, when the response reported one.
+        'history_message' is a shorter stand-in for 'message' to keep in the history (e.g. without
+        context that is only useful for this one turn); the stats still count what was sent.
+        """
+        if wardrobe_state is not None:
+            self._wardrobe_version = wardrobe_state['version']
+            self._wardrobe_labels = wardrobe_state['labels']
+            self._wardrobe_anchor = wardrobe_state['anchor']
+        stored = message if history_message is None else history_message
+        turn = {'id': self._next_turn_id, 'user': stored, 'model': answer,
+                'tokens': estimate_tokens(stored) + estimate_tokens(answer)}
+        self._next_turn_id += 1
+        self.turn_stats.append({
+            'turn': turn['id'],
+            'prompt_tokens': prompt_tokens,
+            'estimated_prompt_tokens': self.summary_tokens() + self.history_tokens() + estimate_tokens(message),
+            'history_turns': len(self.turns),
+        })
+        self.turns.append(turn)
+        self._collapse()
+
+    def _collapse(self):
+        while len(self.turns) > 1 and self.history_tokens() > self.history_budget:
+            oldest = self.turns.pop(0)
+            self.summary_lines.append(
+                f"- User: {_first_sentence(self._user_text(oldest['user']))} Mira: {_first_sentence(oldest['model'])}"
+            )
+        while len(self.summary_lines) > 1 and self.summary_tokens() > self.summary_budget:
+            self.summary_lines.pop(0)
+
+    @staticmethod
+    def _user_text(message):
+        """Pulls the user's own words out of the structured stylist message, if present."""
+        match = re.search(r"\*\*USER COMMAND:\*\* '(.*?)'\.", message, re.S)
+        return match.group(1) if match else message
+
+    @property
+    def last_prompt_tokens(self):
+        if not self.turn_stats:
+            return None
+        stats = self.turn_stats[-1]
+        return stats['prompt_tokens'] if stats['prompt_tokens'] is not None else stats['estimated_prompt_tokens']
@@ -0,0 +1,233 @@
+# gesture_module.py (Thumbs-up, open palm and swipe recognition on MediaPipe hand landmarks)
+"""
+Runs on the 21 hand landmarks MediaPipe already computes, so there is no extra model.
+The landmarks of the last few inferences sit in a small NumPy ring buffer: poses are read
+from their short-term average (smoothing out jitter) and swipes from the palm's trajectory.
+
+A pose has to be seen on GESTURE_ON_FRAMES inferences in a row to fire and is only released
+after GESTURE_OFF_FRAMES misses (hysteresis), so holding a thumbs-up fires once, not every frame.
+"""
+import os
+import time
+import numpy as np
+
+# --- Configuration ---
+# Inferences kept in the ring buffer (swipes must fit inside it)
+HISTORY_FRAMES = 12
+# Recent inferences averaged before reading a pose
+SMOOTHING_FRAMES = 3
+# Consecutive inferences a pose must hold to fire / miss to be released
+GESTURE_ON_FRAMES = int(os.getenv('MIRA_GESTURE_ON_FRAMES', '3'))
+GESTURE_OFF_FRAMES = int(os.getenv('MIRA_GESTURE_OFF_FRAMES', '3'))
+# A finger is extended when its tip is this much farther from the wrist than its middle joint
+EXTENDED_RATIO = 1.1
+# ...and curled when its tip is no farther from the wrist than the joint
+CURLED_RATIO = 1.0
+# Thumb tip distance from the index knuckle (in palm sizes) for the thumb to count as out
+THUMB_OUT = 0.6
+# Thumbs-up: thumb tip at least this far (in palm sizes) above the thumb knuckle
+THUMB_UP_RISE = 0.5
+# Swipe: palm travels this fraction of the frame width within SWIPE_WINDOW_SECONDS...
+SWIPE_MIN_DISTANCE = 0.25
+SWIPE_WINDOW_SECONDS = 0.6
+# ...while moving at most this much vertically per unit of horizontal travel
+SWIPE_MAX_SLOPE = 0.5
+# Poses only count while the palm moves less than this (fraction of the frame) over the smoothing window,
+# and stays within it of where the pose started (so a slow wave never adds up to a hold)
+STILL_DISTANCE = 0.04
+# How long a pose must be held before it fires, on top of GESTURE_ON_FRAMES. The open palm stops
+# Mira mid-answer, so a wave or a briefly raised hand must not be enough.
+OPEN_PALM_HOLD_SECONDS = float(os.getenv('MIRA_OPEN_PALM_HOLD', '1.0'))
+# A garment held by a hand above this height (fraction of the frame from the top) is taken
+# for a top, one held lower for a pair of trousers
+HELD_TOP_MAX_Y = 0.5
+
+THUMBS_UP = 'thumbs_up'
+OPEN_PALM = 'open_palm'
+SWIPE_LEFT = 'swipe_left'    # in image coordinates (the user's right in an unflipped webcam image)
+SWIPE_RIGHT = 'swipe_right'
+GESTURES = (THUMBS_UP, OPEN_PALM, SWIPE_LEFT, SWIPE_RIGHT)
+POSE_HOLD_SECONDS = {THUMBS_UP: 0.0, OPEN_PALM: OPEN_PALM_HOLD_SECONDS}
+
+# MediaPipe hand landmark indices
+WRIST = 0
+THUMB_MCP, THUMB_TIP = 2, 4
+INDEX_MCP, MIDDLE_MCP = 5, 9
+FINGER_PIPS = np.array([6, 10, 14, 18])   # index, middle, ring, pinky middle joints
+FINGER_TIPS = np.array([8, 12, 16, 20])
+PALM = np.array([0, 5, 9, 13, 17])        # wrist and knuckles: a stable palm center
+NUM_LANDMARKS = 21
+
+
+def landmarks_to_array(hand_landmarks, out=None):
+    """Copies a MediaPipe hand (or anything array-like of 21 points) into a (21, 2) float32 x/y array."""
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, 2), np.float32)
+    points = getattr(hand_landmarks, 'landmark', None)
+    if points is None:
+        out[:] = np.asarray(hand_landmarks, np.float32)[:, :2]
+    else:
+        out[:] = [(point.x, point.y) for point in points]
+    return out
+
+
+def classify_pose(points):
+    """Returns THUMBS_UP, OPEN_PALM or None for one (21, 2) array of normalized landmarks."""
+    wrist = points[WRIST]
+    palm_size = np.linalg.norm(points[MIDDLE_MCP] - wrist)
+    if palm_size < 1e-6:
+        return None
+
+    # One vectorized pass for the four fingers: tip vs middle-joint distance from the wrist
+    tip_distance = np.linalg.norm(points[FINGER_TIPS] - wrist, axis=1)
+    pip_distance = np.linalg.norm(points[FINGER_PIPS] - wrist, axis=1)
+    ratios = tip_distance / np.maximum(pip_distance, 1e-6)
+    thumb_out = np.linalg.norm(points[THUMB_TIP] - points[INDEX_MCP]) > THUMB_OUT * palm_size
+
+    if thumb_out and (ratios <= CURLED_RATIO).all():
+        # y grows downwards: the thumb tip must be well above its knuckle and every fingertip
+        rise = points[THUMB_MCP, 1] - points[THUMB_TIP, 1]
+        if rise > THUMB_UP_RISE * palm_size and points[THUMB_TIP, 1] < points[FINGER_TIPS, 1].min():
+            return THUMBS_UP
+    if thumb_out and (ratios >= EXTENDED_RATIO).all() and (points[FINGER_TIPS, 1] < wrist[1]).all():
+        return OPEN_PALM
+    return None
+
+
+class GestureRecognizer:
+    """Feed it one hand per inference with update(); it returns a gesture name when one fires."""
+
+    def __init__(self, history=HISTORY_FRAMES, on_frames=GESTURE_ON_FRAMES, off_frames=GESTURE_OFF_FRAMES):
+        self.on_frames = on_frames
+        self.off_frames = off_frames
+        # Ring buffer of recent landmarks (x/y only: MediaPipe's z is too noisy to help here)
+        self._points = np.zeros((history, NUM_LANDMARKS, 2), np.float32)
+        self._times = np.zeros(history)
+        self._next = 0    # slot the next inference is written to
+        self._size = 0    # slots holding inferences of the current, unbroken hand track
+        self._last_swipe_at = None  # the rest of a swipe's motion must not fire a second one
+        # Hysteresis state
+        self.active = None        # pose currently held (already fired)
+        self._candidate = None    # pose being confirmed
+        self._candidate_since = 0.0
+        self._candidate_at = None  # palm center where the candidate pose started
+        self._hits = 0
+        self._misses = 0
+
+    def reset(self):
+        self._size = 0
+        self._last_swipe_at = None
+        self.active = self._candidate = None
+        self._candidate_since, self._candidate_at = 0.0, None
+        self._hits = self._misses = 0
+
+    def update(self, hand_landmarks, timestamp=None):
+        """
+        Adds the landmarks of one inference (None when no hand was found) and returns the gesture
+        that fired on it, or None.
+        """
+        now = time.perf_counter() if timestamp is None else timestamp
+        if hand_landmarks is None:
+            self._size = 0  # a swipe cannot span frames without a hand
+            self._confirm(None, now)
+            return None
+
+        landmarks_to_array(hand_landmarks, self._points[self._next])
+        self._times[self._next] = now
+        self._next = (self._next + 1) % len(self._times)
+        self._size = min(self._size + 1, len(self._times))
+
+        recent = self._recent(self._size)
+        swipe = self._swipe(recent, now)
+        if swipe is not None:
+            # Start a new track, so one swipe fires once and no pose is read mid-motion
+            self._last_swipe_at = now
+            self._size = 0
+            self._confirm(None, now)
+            return swipe
+
+        smoothed = self._recent(min(self._size, SMOOTHING_FRAMES))
+        centers = self._points[smoothed][:, PALM].mean(axis=1)
+        moving = np.abs(centers - centers[-1]).max() > STILL_DISTANCE
+        pose = None if moving else classify_pose(self._points[smoothed].mean(axis=0))
+        return self._confirm(pose, now, centers[-1])
+
+    def latest_points(self):
+        """Smoothed (21, 2) landmarks of the current hand track (what poses are read from), or None."""
+        if not self._size:
+            return None
+        return self._points[self._recent(min(self._size, SMOOTHING_FRAMES))].mean(axis=0)
+
+    def _recent(self, count):
+        """Ring buffer indices of the newest 'count' inferences, oldest first."""
+        return (self._next - count + np.arange(count)) % len(self._times)
+
+    def _swipe(self, recent, now):
+        if len(recent) < 3:
+            return None
+        if self._last_swipe_at is not None and now - self._last_swipe_at < SWIPE_WINDOW_SECONDS:
+            return None
+        in_window = recent[self._times[recent] >= now - SWIPE_WINDOW_SECONDS]
+        if len(in_window) < 3:
+            return None
+        centers = self._points[in_window][:, PALM].mean(axis=1)
+        dx, dy = centers[-1] - centers[0]
+        if abs(dx) < SWIPE_MIN_DISTANCE or abs(dy) > SWIPE_MAX_SLOPE * abs(dx):
+            return None
+        # Travel must be steady in one direction, not a jitter between two far-apart readings
+        steps = np.diff(centers[:, 0])
+        if (np.sign(steps) == np.sign(dx)).mean() < 0.75:
+            return None
+        return SWIPE_RIGHT if dx > 0 else SWIPE_LEFT
+
+    def _confirm(self, pose, now, center=None):
+        """Hysteresis: returns 'pose' on the inference it becomes active, otherwise None."""
+        if self.active is not None:
+            if pose == self.active:
+                self._misses = 0
+                return None
+            self._misses += 1
+            if self._misses < self.off_frames:
+                return None
+            self.active = None
+            self._misses = 0
+        if pose is None:
+            self._candidate, self._hits = None, 0
+            return None
+        drifted = center is not None and self._candidate_at is not None and \
+            np.abs(center - self._candidate_at).max() > STILL_DISTANCE
+        if pose == self._candidate and not drifted:
+            self._hits += 1
+        else:
+            self._candidate, self._hits, self._candidate_since, self._candidate_at = pose, 1, now, center
+        if self._hits < self.on_frames or now - self._candidate_since < POSE_HOLD_SECONDS.get(pose, 0.0):
+            return None
+        self.active, self._candidate, self._hits = pose, None, 0
+        return pose
+
+
+def hand_bbox(points, width, height):
+    """Pixel (x1, y1, x2, y2) bounding box of a (21, 2) normalized landmark array in a width x height frame."""
+    (x1, y1), (x2, y2) = points.min(axis=0), points.max(axis=0)
+    return int(x1 * width), int(y1 * height), int(x2 * width), int(y2 * height)
+
+
+def held_item_bbox(points, width, height):
+    """
+    Pixel box where a garment held up by this hand would be: hanging below the hand, twice
+    as wide as it and three times as tall. Clipped to the frame; None if nothing is left.
+    """
+    x1, y1, x2, y2 = hand_bbox(points, width, height)
+    hand_width = max(x2 - x1, 1)
+    center = (x1 + x2) // 2
+    box = (max(center - hand_width, 0), min(y2, height), min(center + hand_width, width), min(y2 + 3 * hand_width, height))
+    return box if box[2] > box[0] and box[3] > box[1] else None
+
+
+def held_item_label(points):
+    """
+    Wardrobe label for the garment held by this hand. Only a guess from how high it is held (there
+    is no garment detector): at chest height or above it hangs over the torso ('top'), lower down
+    over the legs ('pants').
+    """
+    return 'top' if points[:, 1].mean() < HELD_TOP_MAX_Y else 'pants'
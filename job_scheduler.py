@@ -0,0 +1,217 @@
+# job_scheduler.py (Bounded per-session job queues on a shared executor, with cancellation)
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+JOB_WORKERS = int(os.getenv('MIRA_JOB_WORKERS', '8'))
+# Jobs waiting per (session, kind); further submissions are rejected until one starts
+SESSION_QUEUE_SIZE = int(os.getenv('MIRA_SESSION_QUEUE_SIZE', '2'))
+# Jobs waiting across all sessions; beyond this every submission is rejected (backpressure)
+MAX_PENDING_JOBS = int(os.getenv('MIRA_MAX_PENDING_JOBS', '64'))
+
+
+class CancelToken:
+    """Set when a job is cancelled or superseded. Jobs poll 'cancelled' between steps."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancel callback failed: {e}")
+
+    def on_cancel(self, callback):
+        """Runs 'callback' when the token is cancelled (right away if it already is)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+class Job:
+    def __init__(self, session_id, kind, fn, args):
+        self.session_id = session_id
+        self.kind = kind
+        self.fn = fn
+        self.args = args
+        self.token = CancelToken()
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self._finished = threading.Event()
+
+    @property
+    def done(self):
+        """True once the job has run (or was dropped from the queue before it could start)."""
+        return self._finished.is_set()
+
+
+class JobScheduler:
+    """
+    Runs jobs on one shared thread pool. Each (session, kind) pair is a lane that runs one job
+    at a time, in order, with at most queue_size jobs waiting. Submitting with supersede=True
+    cancels the lane's running job and drops its waiting ones, so the newest command wins.
+    Job functions are called as fn(token, *args).
+    """
+
+    def __init__(self, workers=JOB_WORKERS, queue_size=SESSION_QUEUE_SIZE, max_pending=MAX_PENDING_JOBS):
+        self.queue_size = queue_size
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mira-job")
+        self._lock = threading.Lock()
+        self._pending = {}  # (session_id, kind) -> deque of waiting jobs
+        self._running = {}  # (session_id, kind) -> running job
+        self._pending_total = 0
+        # Metrics
+        self.submitted = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.completed = 0
+        self.max_depth = 0
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def submit(self, session_id, kind, fn, *args, supersede=False):
+        """Queues a job. Returns the Job, or None if it was rejected because the queues are full."""
+        lane = (session_id, kind)
+        job = Job(session_id, kind, fn, args)
+        superseded = []
+        with self._lock:
+            waiting = self._pending.setdefault(lane, deque())
+            # Capacity is checked before anything is cancelled: a rejected submission leaves the
+            # lane as it was. Superseding frees the lane's waiting slots, so they do not count.
+            dropped = len(waiting) if supersede else 0
+            if len(waiting) - dropped >= self.queue_size or self._pending_total - dropped >= self.max_pending:
+                self.rejected += 1
+                job = None
+                if lane not in self._running and not waiting:
+                    self._pending.pop(lane, None)
+            else:
+                if supersede:
+                    superseded = self._cancel_lane(lane)
+                self.submitted += 1
+                waiting.append(job)
+                self._pending_total += 1
+                self.max_depth = max(self.max_depth, self._pending_total)
+                if lane not in self._running:
+                    self._start_next(lane)
+        # Cancel callbacks run outside the lock (they may stop audio, close streams, ...)
+        for old_job in superseded:
+            old_job.token.cancel()
+        return job
+
+    def cancel_session(self, session_id, kind=None):
+        """Cancels the running and waiting jobs of a session (only lanes of 'kind', if given)."""
+        cancelled = []
+        with self._lock:
+            for lane in list(self._pending):
+                if lane[0] == session_id and kind in (None, lane[1]):
+                    cancelled.extend(self._cancel_lane(lane))
+        for job in cancelled:
+            job.token.cancel()
+
+    def _cancel_lane(self, lane):
+        """Called with the lock held: takes the lane's jobs out of the queue and returns them for cancelling."""
+        cancelled = []
+        running = self._running.get(lane)
+        if running is not None and not running.token.cancelled:
+            cancelled.append(running)
+        waiting = self._pending.get(lane)
+        while waiting:
+            job = waiting.popleft()
+            job._finished.set()  # never starts
+            cancelled.append(job)
+            self._pending_total -= 1
+        self.cancelled += len(cancelled)
+        return cancelled
+
+    def _start_next(self, lane):
+        """Called with the lock held: moves the lane's next waiting job onto the executor."""
+        waiting = self._pending.get(lane)
+        if not waiting:
+            self._running.pop(lane, None)
+            self._pending.pop(lane, None)  # idle lanes are forgotten, so finished sessions leave nothing behind
+            return
+        job = waiting.popleft()
+        self._pending_total -= 1
+        self._running[lane] = job
+        self._executor.submit(self._run, lane, job)
+
+    def _run(self, lane, job):
+        job.started_at = time.perf_counter()
+        wait = job.started_at - job.submitted_at
+        with self._lock:
+            self._wait_count += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+        try:
+            if not job.token.cancelled:
+                job.fn(job.token, *job.args)
+        except Exception as e:
+            print(f"Job '{job.kind}' failed: {e}")
+        finally:
+            job._finished.set()
+            with self._lock:
+                self.completed += 1
+                self._start_next(lane)
+
+    def queue_depth(self, session_id=None):
+        """Jobs waiting to start, overall or for one session."""
+        with self._lock:
+            if session_id is None:
+                return self._pending_total
+            return sum(len(waiting) for (session, _), waiting in self._pending.items() if session == session_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._pending_total,
+                'max_queue_depth': self.max_depth,
+                'running': len(self._running),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'cancelled': self.cancelled,
+                'avg_wait_ms': self._wait_total / self._wait_count * 1000 if self._wait_count else 0.0,
+                'max_wait_ms': self._wait_max * 1000,
+            }
+
+    def shutdown(self):
+        cancelled = []
+        with self._lock:
+            for lane in list(self._pending):
+                cancelled.extend(self._cancel_lane(lane))
+        for job in cancelled:
+            job.token.cancel()
+        self._executor.shutdown(wait=False)
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+
+def get_job_scheduler():
+    """Returns the process-wide scheduler (one thread pool for every session)."""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = JobScheduler()
+        return _shared_scheduler
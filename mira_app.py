@@ -1,50 +1,50 @@
 import streamlit as st
+import os
 import threading
 import time
+import uuid
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from streamlit_webrtc import webrtc_streamer, VideoProcessorBase
-import cv2
-import av
-import numpy as np
 
 # --- Core Module Imports ---
 from dotenv import load_dotenv
 load_dotenv()
 
-# IMPORTANT: Ensure these files exist in your project structure
-from voice_module import VoiceModule
-from ai_stylist_module import AIStylistModule
-from vision_module import VisionProcessor
-from wardrobe_db import get_wardrobe_summary
-
-# --- GLOBAL LOCK FOR THREAD SAFETY ---
-SESSION_LOCK = threading.Lock()
+# IMPORTANT: Ensure these files exist in your project structure.
+# The vision, voice and stylist modules (mediapipe, cv2, google.genai, elevenlabs, ...)
+# are NOT imported here: resource_registry loads them on a background thread so the
+# UI renders first. See startup_profile.py for per-import timings.
+import perf_metrics
+import resource_registry
+from job_scheduler import get_job_scheduler
+from startup_profile import PROFILE_STARTUP, format_startup_profile
+from wardrobe_db import add_item_to_wardrobe, get_wardrobe_summary
+
+# Stream answers sentence by sentence into the chat and the voice pipeline (0 = wait for the full answer)
+STREAMING_RESPONSES = os.getenv('MIRA_STREAMING', '1') == '1'
+# How often the page refreshes while background work (loading, streaming) is in flight
+POLL_INTERVAL = 0.4 # seconds
+
+WELCOME_TEXT = "Hello! I'm MiraAI, your personal AI fashion stylist. What fashion question do you have for me?"
+AI_ERROR_TEXT = "My styling brain failed: An error occurred during AI processing. Please check the console."
+BUSY_TEXT = "Mira is busy with other requests right now. Please try again in a moment."
+# Sent to the stylist when the user swipes for the next suggestion
+NEXT_SUGGESTION_COMMAND = "Show me a different outfit from the last one."
+
+READINESS_ICONS = {'pending': '⏳', 'loading': '🔄', 'ready': '✅'}
 
 # --- 1. INITIALIZATION FUNCTION (Guaranteed to run once per session) ---
 def initialize_session_state():
-    """Initializes all necessary modules and state variables once."""
-    
-    # 1. Initialize Voice Module
-    if 'voice_module' not in st.session_state:
-        print("Initializing Voice Module...")
-        st.session_state.voice_module = VoiceModule()
-        print("Voice Module Ready.")
+    """Initializes state variables once and attaches each module as soon as its subsystem has loaded."""
 
-    # 2. Initialize Vision Processor
-    if 'vision_processor' not in st.session_state:
-        print("Initializing Vision Processor...")
-        st.session_state.vision_processor = VisionProcessor(
-            item_save_callback=st.session_state.voice_module.speak_response
-        )
-        print("Vision Processor Ready.")
-
-    # 3. Initialize AI Stylist Module
-    if 'ai_stylist' not in st.session_state:
-        print("Initializing AI Stylist Module...")
-        st.session_state.ai_stylist = AIStylistModule(
-            vision_processor=st.session_state.vision_processor 
-        )
-        print("AI Stylist Module Ready.")
+    # 0. Kick off background loading of the shared, process-wide resources (idempotent).
+    # The canned phrases are synthesized into the TTS cache once, before any session can speak.
+    resource_registry.start_background_loading(prewarm_phrases=[WELCOME_TEXT, AI_ERROR_TEXT])
 
+    # Identifies this session's job queues; its lock guards the chat state the jobs update
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+        st.session_state.session_lock = threading.Lock()
 
     if 'chat_history' not in st.session_state:
         st.session_state.chat_history = []
@@ -55,23 +55,195 @@ def initialize_session_state():
     # Initialize the audio queue variable
     if 'mira_audio_to_play' not in st.session_state:
         st.session_state.mira_audio_to_play = None
+
+    # True while a typed command is being answered (the UI polls to show the answer growing).
+    # Only the script thread sets and clears it, so the poll at the end of main() cannot miss it.
+    if 'response_streaming' not in st.session_state:
+        st.session_state.response_streaming = False
+        st.session_state.command_job = None
     
-    # FINAL CRITICAL FIX: Ensure the resource delay runs ONLY ONCE
-    if 'initial_delay_done' not in st.session_state:
-        st.session_state.initial_delay_done = True
-        print("Waiting 3 seconds for system to stabilize after model load...")
-        time.sleep(3) # Increased delay to 3s for certainty
-        print("Startup delay complete.")
-
-    # Send initial welcome message only on first run (after the delay check)
+    # Send initial welcome message only on first run (it is spoken once the voice module is ready)
     if len(st.session_state.chat_history) == 0:
-        welcome_text = "Hello! I'm MiraAI, your personal AI fashion stylist. What fashion question do you have for me?"
+        welcome_text = WELCOME_TEXT
         
         # Queue the initial response for playback
         st.session_state.mira_audio_to_play = welcome_text
         st.session_state.chat_history.append({"role": "mira", "content": welcome_text})
-        
-    print("Application ready.")
+
+    attach_ready_modules()
+
+
+def attach_ready_modules():
+    """
+    Builds this session's modules for every subsystem that has finished loading (cheap once loaded).
+    Each one attaches on its own: a subsystem that failed to load (e.g. voice without PortAudio)
+    only takes its own feature away.
+    """
+
+    # 1. Initialize Voice Module
+    voice = resource_registry.get_module('voice')
+    if voice and 'voice_module' not in st.session_state:
+        print("Initializing Voice Module...")
+        st.session_state.voice_module = voice.VoiceModule()
+        print("Voice Module Ready.")
+        if 'vision_processor' in st.session_state:
+            # Vision came first: its gestures can speak now
+            wire_gestures(st.session_state.vision_processor)
+
+    # 2. Initialize Vision Processor
+    vision = resource_registry.get_module('vision')
+    if vision and 'vision_processor' not in st.session_state:
+        print("Initializing Vision Processor...")
+        st.session_state.vision_processor = vision.VisionProcessor(hands_pool=resource_registry.get_hands_pool())
+        wire_gestures(st.session_state.vision_processor)
+        if 'ai_stylist' in st.session_state:
+            st.session_state.ai_stylist.vision_processor = st.session_state.vision_processor
+        print("Vision Processor Ready.")
+
+    # 3. Initialize AI Stylist Module (the live camera status is optional)
+    stylist = resource_registry.get_module('stylist')
+    if stylist and 'ai_stylist' not in st.session_state:
+        print("Initializing AI Stylist Module...")
+        st.session_state.ai_stylist = stylist.AIStylistModule(
+            vision_processor=st.session_state.get('vision_processor')
+        )
+        print("AI Stylist Module Ready.")
+
+
+def wire_gestures(processor):
+    """(Re)connects the processor's gesture callbacks, with spoken feedback once the voice module is there."""
+    # Gestures fire on the vision worker thread; the callbacks only queue session jobs
+    save_item, next_suggestion, stop = gesture_actions(session_job_submitter(), st.session_state.get('voice_module'))
+    processor.item_save_callback = save_item
+    processor.next_suggestion_callback = next_suggestion
+    processor.stop_callback = stop
+
+
+def render_readiness():
+    """Sidebar panel showing which subsystems are loaded. Returns True while anything is still loading."""
+    states = resource_registry.readiness()
+    with st.sidebar:
+        st.subheader("System Status")
+        for name, state in states.items():
+            icon = READINESS_ICONS.get(state, '❌')
+            st.text(f"{icon} {name}: {state}")
+        if PROFILE_STARTUP:
+            with st.expander("Startup profile"):
+                st.code(format_startup_profile())
+    return any(state in ('pending', 'loading') for state in states.values())
+
+
+def render_job_metrics():
+    """Sidebar numbers for the shared job queues (all sessions)."""
+    stats = get_job_scheduler().stats()
+    with st.sidebar.expander("Job queue"):
+        st.text(f"Queued: {stats['queue_depth']} (max {stats['max_queue_depth']}), running: {stats['running']}")
+        st.text(f"Wait: avg {stats['avg_wait_ms']:.0f} ms, max {stats['max_wait_ms']:.0f} ms")
+        st.text(f"Cancelled: {stats['cancelled']}, rejected: {stats['rejected']}")
+
+
+def render_perf_panel():
+    """Sidebar panel with live stage latencies, counters and FPS (only with MIRA_PERF_METRICS=1)."""
+    if not perf_metrics.enabled():
+        return
+    snapshot = perf_metrics.snapshot()
+    with st.sidebar.expander("Performance"):
+        for name, rate in snapshot['rates'].items():
+            st.text(f"{name}: {rate:.1f}/s")
+        for name, value in snapshot['counters'].items():
+            st.text(f"{name}: {value}")
+        st.code(perf_metrics.format_table())
+        st.download_button("Export JSON", perf_metrics.export_json(), file_name="mira_perf.json",
+                           mime="application/json")
+
+
+def render_prompt_stats():
+    """Sidebar list of this session's prompt sizes per stylist turn (API-reported, else estimated)."""
+    stylist = st.session_state.get('ai_stylist')
+    stats = stylist.prompt_token_stats() if stylist is not None else []
+    if not stats:
+        return
+    with st.sidebar.expander("Prompt tokens"):
+        for turn in stats[-10:]:
+            reported = turn['prompt_tokens'] if turn['prompt_tokens'] is not None else '-'
+            st.text(f"Turn {turn['turn']}: {reported} (est. {turn['estimated_prompt_tokens']}), "
+                    f"{turn['history_turns']} turns in history")
+
+
+def session_job_submitter():
+    """
+    Returns submit(kind, fn, *args, supersede=False) bound to this session. It can be called
+    from any thread; the job runs on the shared scheduler with this session's script context,
+    so it can still read and update st.session_state.
+    """
+    session_id = st.session_state.session_id
+    ctx = get_script_run_ctx()
+    scheduler = get_job_scheduler()
+
+    def submit(kind, fn, *args, supersede=False):
+        def run(token, *job_args):
+            add_script_run_ctx(threading.current_thread(), ctx)
+            fn(token, *job_args)
+        return scheduler.submit(session_id, kind, run, *args, supersede=supersede)
+
+    return submit
+
+
+def submit_user_command(submit, user_command, use_cache=True):
+    """Queues a command; a newer command supersedes the one still being answered. Returns the Job, or None if rejected."""
+    target = process_user_command_streaming if STREAMING_RESPONSES else process_user_command
+    return submit('command', target, user_command, use_cache, supersede=True)
+
+
+def speak_job(token, voice, text):
+    if not token.cancelled:
+        voice.speak_response(text)
+
+
+def save_item_job(token, voice, item):
+    """Stores the garment a thumbs-up pointed at and confirms it out loud (when there is a voice)."""
+    merged = add_item_to_wardrobe(item)
+    if voice is not None and not token.cancelled:
+        color = item.get('color', 'unknown')
+        name = item.get('label', 'piece') if color == 'unknown' else f"{color} {item.get('label', 'piece')}"
+        voice.speak_response(f"That {name} is already in your wardrobe." if merged
+                             else f"Saved the {name} to your wardrobe.")
+
+
+def gesture_actions(submit, voice):
+    """
+    Returns the (save_item, next_suggestion, stop) callbacks for thumbs-up, swipe and open palm.
+    'voice' may be None (voice subsystem not loaded): the gestures then work silently.
+    """
+    session_id = st.session_state.session_id
+
+    def save_item(item):
+        submit('gesture', save_item_job, voice, item)
+
+    def next_suggestion():
+        # The same words every time, so skip the response cache to get a new outfit
+        submit_user_command(submit, NEXT_SUGGESTION_COMMAND, use_cache=False)
+
+    def stop():
+        get_job_scheduler().cancel_session(session_id, 'command')
+        if voice is not None:
+            voice.cancel_speech()
+
+    return save_item, next_suggestion, stop
+
+
+def render_voice_controls():
+    """Sidebar toggle for hands-free mode: spoken commands go through the same path as typed ones."""
+    if 'ai_stylist' not in st.session_state or 'voice_module' not in st.session_state:
+        return
+    voice = st.session_state.voice_module
+    with st.sidebar:
+        listening = st.toggle("Continuous listening", key="continuous_listening")
+    if listening and voice.listener is None:
+        submit = session_job_submitter()
+        voice.start_continuous_listening(on_command=lambda text: submit_user_command(submit, text))
+    elif not listening and voice.listener is not None:
+        voice.stop_continuous_listening()
 
 
 # --- 2. VIDEO PROCESSOR CLASS (Fixed __init__ method) ---
@@ -81,30 +253,47 @@ class MiraAITransformer(VideoProcessorBase):
     def __init__(self):
         pass
 
-    def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
+    def recv(self, frame: "av.VideoFrame") -> "av.VideoFrame":
         # Safely access the processor from st.session_state inside recv
-        processor = st.session_state.vision_processor
-        img = frame.to_ndarray(format="bgr24")
-        annotated_img = processor.process_frame(img)
-        return av.VideoFrame.from_ndarray(annotated_img, format="bgr24")
+        processor = st.session_state.get('vision_processor')
+        if processor is None:
+            # Vision is still loading: show the plain mirror until it is ready.
+            return frame
 
-# --- 3. AI & CHAT LOGIC (Running in Background Thread) ---
-def process_user_command(user_command):
-    """Handles user input, calls Gemini, and queues the result."""
+        # Latest-frame mode: inference runs on a worker thread at reduced resolution,
+        # recv only overlays the newest landmarks (or passes the frame through untouched).
+        return processor.process_video_frame(frame)
+
+    def on_ended(self):
+        # The WebRTC stream is over: stop the inference worker and give the hands graph back
+        processor = st.session_state.get('vision_processor')
+        if processor is not None:
+            processor.stop()
+
+# --- 3. AI & CHAT LOGIC (Running as scheduler jobs) ---
+def process_user_command(token, user_command, use_cache=True):
+    """Handles user input, calls Gemini, and queues the result (dropped if a newer command superseded it)."""
 
     user_message = {"role": "user", "content": user_command}
-    
+    if 'ai_stylist' not in st.session_state:
+        return  # e.g. a swipe before the stylist has loaded
+
     try:
         # Generate the response using the AI stylist module
-        response_text = st.session_state.ai_stylist.generate_outfit_suggestion(user_command)
+        response_text = st.session_state.ai_stylist.generate_outfit_suggestion(
+            user_command, cancel_token=token, use_cache=use_cache
+        )
     except Exception as e:
-        response_text = f"My styling brain failed: An error occurred during AI processing. Please check the console."
+        response_text = AI_ERROR_TEXT
         print(f"AI Stylist Error: {e}")
 
+    if token.cancelled:
+        return
+
     mira_message = {"role": "mira", "content": response_text}
 
-    # FINAL SAFE UPDATE: Update all state variables ONCE under the global lock
-    with SESSION_LOCK:
+    # FINAL SAFE UPDATE: Update all state variables ONCE under the session lock
+    with st.session_state.session_lock:
         st.session_state.chat_history.append(user_message)
         st.session_state.chat_history.append(mira_message)
         
@@ -115,6 +304,49 @@ def process_user_command(user_command):
         st.session_state.command_trigger = True
 
 
+def process_user_command_streaming(token, user_command, use_cache=True):
+    """
+    Streams the answer: each sentence is appended to the chat and queued for speech as it arrives.
+    Stops (and silences Mira) as soon as a newer command supersedes it.
+    """
+    stylist = st.session_state.get('ai_stylist')
+    if stylist is None:
+        return  # e.g. a swipe before the stylist has loaded
+    voice = st.session_state.get('voice_module')  # None: the answer is only shown, not spoken
+    lock = st.session_state.session_lock
+    mira_message = {"role": "mira", "content": ""}
+
+    # A new answer preempts whatever Mira is still saying
+    if voice is not None:
+        voice.cancel_speech()
+        token.on_cancel(voice.cancel_speech)
+
+    with lock:
+        st.session_state.chat_history.append({"role": "user", "content": user_command})
+        st.session_state.chat_history.append(mira_message)
+        st.session_state.command_trigger = True
+
+    try:
+        for sentence in stylist.stream_outfit_suggestion(user_command, cancel_token=token, use_cache=use_cache):
+            if token.cancelled:
+                break
+            with lock:
+                mira_message["content"] = f"{mira_message['content']} {sentence}".strip()
+            # Speech starts with the first sentence while the rest is still being generated
+            if voice is not None:
+                voice.enqueue_speech(sentence, cancel_token=token)
+    except Exception as e:
+        print(f"AI Stylist Error: {e}")
+        with lock:
+            if not mira_message["content"]:
+                mira_message["content"] = AI_ERROR_TEXT
+    finally:
+        with lock:
+            if token.cancelled and not mira_message["content"]:
+                st.session_state.chat_history.remove(mira_message)
+            st.session_state.command_trigger = True
+
+
 # --- 4. MAIN UI FUNCTION ---
 def main():
     # --- Check for Rerun Trigger ---
@@ -122,16 +354,22 @@ def main():
         st.session_state.command_trigger = False
         st.rerun()
 
-    # Play queued audio in a separate thread to prevent blocking the UI
-    if st.session_state.mira_audio_to_play:
+    still_loading = render_readiness()
+    render_job_metrics()
+    render_perf_panel()
+    render_prompt_stats()
+    render_voice_controls()
+    submit = session_job_submitter()
+
+    # Play queued audio as a background job to prevent blocking the UI
+    # (it stays queued until the voice module has loaded)
+    if st.session_state.mira_audio_to_play and 'voice_module' in st.session_state:
         audio_text = st.session_state.mira_audio_to_play
         st.session_state.mira_audio_to_play = None # Clear the queue immediately
         
-        # LAUNCH AUDIO PLAYBACK IN A SEPARATE THREAD (NON-BLOCKING)
-        threading.Thread(
-            target=st.session_state.voice_module.speak_response,
-            args=(audio_text,)
-        ).start()
+        # Newer audio replaces audio that has not started yet
+        if submit('speech', speak_job, st.session_state.voice_module, audio_text, supersede=True) is None:
+            st.warning(BUSY_TEXT)
 
     st.title("✨ MiraAI: Live Personal Stylist")
     st.markdown("Your AI assistant for real-time fashion advice.")
@@ -144,12 +382,17 @@ def main():
         st.markdown("**(Hold clothing up to the camera)**")
 
         # Start the webcam stream with the VideoProcessor
-        webrtc_streamer(
+        webrtc_ctx = webrtc_streamer(
             key="mira_webcam",
             video_processor_factory=MiraAITransformer,
             async_processing=True,
             media_stream_constraints={"video": True, "audio": False},
         )
+        # Camera stopped: free the worker thread and the pinned hands graph for other sessions.
+        # (Closed tabs never rerun; there the worker exits by itself once frames stop arriving.)
+        processor = st.session_state.get('vision_processor')
+        if processor is not None and not webrtc_ctx.state.playing:
+            processor.stop()
 
     with col2:
         st.header("Wardrobe & Status")
@@ -162,7 +405,7 @@ def main():
         st.subheader("Mira's Responses")
 
         # Acquire lock for reading chat history safely
-        with SESSION_LOCK:
+        with st.session_state.session_lock:
             for message in st.session_state.chat_history[-5:]: # Show last 5 messages
                 if message["role"] == "mira":
                     st.info(message["content"])
@@ -180,10 +423,31 @@ def main():
         key="user_text_input"
     )
 
-    if st.button("Send Command"):
+    stylist_ready = 'ai_stylist' in st.session_state
+    if st.button("Send Command", disabled=not stylist_ready):
         if user_input:
-            # Launch the processor in a thread to prevent the UI from locking
-            threading.Thread(target=process_user_command, args=(user_input,)).start()
+            # Queue the processor as a background job to prevent the UI from locking
+            job = submit_user_command(submit, user_input)
+            if job is None:
+                st.warning(BUSY_TEXT)
+            else:
+                # Set here rather than in the job, so the poll below is sure to see it
+                st.session_state.command_job = job
+                st.session_state.response_streaming = True
+    if not stylist_ready:
+        st.caption("Mira is still getting ready...")
+
+    # Poll while background work is in flight: modules attaching after loading,
+    # and a streamed answer growing sentence by sentence in the chat
+    job = st.session_state.command_job
+    if job is not None and job.done:
+        # The answer is complete; one last rerun shows whatever arrived after this run rendered
+        st.session_state.command_job = None
+        st.session_state.response_streaming = False
+        st.rerun()
+    if still_loading or st.session_state.response_streaming:
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
 
 # --- Execute Main Function ---
 if __name__ == '__main__':
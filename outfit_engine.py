@@ -0,0 +1,288 @@
+# outfit_engine.py (Local outfit candidates: color-harmony matrix, compatibility table, beam search)
+import heapq
+import re
+import threading
+
+from color_module import NEUTRAL_COLORS, PALETTE_NAMES
+from wardrobe_db import categorize_label
+
+# --- Configuration ---
+BEAM_WIDTH = 16          # partial outfits kept after each slot
+CLASSES_PER_SLOT = 12    # best item classes considered per slot (pruning)
+DEFAULT_TOP_K = 3
+COMPLETENESS_BONUS = 0.05  # per item beyond the first, so shoes and accessories get added when they fit
+COLOR_BONUS = 0.3  # per item in the color the user asked for
+
+# --- Color harmony ---
+# Scores for each scheme; 'clash' is anything the rules below do not cover.
+HARMONY_SCORES = {
+    'complementary': 0.95,
+    'analogous': 0.9,
+    'neutral': 0.9,
+    'monochrome': 0.8,
+    'unknown': 0.5,
+    'clash': 0.3,
+}
+ANALOGOUS_DEGREES = 60       # wheel distance up to this is analogous...
+COMPLEMENTARY_DEGREES = 150  # ...and from this up to 180 complementary
+
+# Positions on the artist's (RYB) color wheel, which is the one the styling rules talk about
+# (red/green, blue/orange and yellow/purple are complementary). Neutrals have no position.
+COLOR_WHEEL = {
+    'red': 0, 'burgundy': 345, 'pink': 330, 'orange': 60, 'yellow': 120, 'olive': 150,
+    'green': 180, 'light blue': 230, 'blue': 240, 'purple': 300,
+}
+
+COLOR_NAMES = PALETTE_NAMES + ('unknown',)
+COLOR_INDEX = {name: i for i, name in enumerate(COLOR_NAMES)}
+
+
+def _harmony_scheme(a, b):
+    if a == 'unknown' or b == 'unknown':
+        return 'unknown'
+    if a == b:
+        return 'monochrome'
+    if a in NEUTRAL_COLORS or b in NEUTRAL_COLORS:
+        return 'neutral'
+    difference = abs(COLOR_WHEEL[a] - COLOR_WHEEL[b])
+    difference = min(difference, 360 - difference)
+    if difference <= ANALOGOUS_DEGREES:
+        return 'analogous'
+    if difference >= COMPLEMENTARY_DEGREES:
+        return 'complementary'
+    return 'clash'
+
+
+# Precomputed for every palette pair (plus 'unknown'), indexed by COLOR_INDEX
+HARMONY_SCHEME = [[_harmony_scheme(a, b) for b in COLOR_NAMES] for a in COLOR_NAMES]
+HARMONY_MATRIX = [[HARMONY_SCORES[scheme] for scheme in row] for row in HARMONY_SCHEME]
+
+# --- Styles and occasions ---
+STYLES = ('casual', 'smart', 'formal', 'sporty')
+_STYLE_BIT = {style: 1 << i for i, style in enumerate(STYLES)}
+
+# Style is inferred from the label (the detector gives us nothing else); unlisted labels use their category default
+LABEL_STYLES = {
+    't-shirt': ('casual', 'sporty'), 'tank top': ('casual', 'sporty'), 'hoodie': ('casual', 'sporty'),
+    'shirt': ('smart', 'formal', 'casual'), 'blouse': ('smart', 'formal'), 'polo': ('smart', 'casual'),
+    'sweater': ('casual', 'smart'), 'cardigan': ('casual', 'smart'), 'top': ('casual', 'smart'),
+    'jeans': ('casual', 'smart'), 'shorts': ('casual', 'sporty'), 'leggings': ('sporty', 'casual'),
+    'trousers': ('smart', 'formal'), 'pants': ('smart', 'casual'), 'skirt': ('smart', 'casual', 'formal'),
+    'blazer': ('smart', 'formal'), 'coat': ('smart', 'formal', 'casual'), 'parka': ('casual',),
+    'jacket': ('casual', 'smart'), 'vest': ('smart', 'formal'),
+    'dress': ('smart', 'formal', 'casual'), 'suit': ('formal',), 'jumpsuit': ('smart', 'casual'),
+    'sneakers': ('casual', 'sporty'), 'sandals': ('casual',), 'boots': ('casual', 'smart'),
+    'heels': ('formal', 'smart'), 'loafers': ('smart', 'formal'), 'flats': ('smart', 'casual'),
+    'tie': ('formal', 'smart'), 'backpack': ('casual', 'sporty'), 'cap': ('casual', 'sporty'),
+    'watch': ('smart', 'formal', 'casual'), 'necklace': ('smart', 'formal'), 'earrings': ('smart', 'formal'),
+    'handbag': ('smart', 'formal', 'casual'), 'suitcase': (), 'umbrella': (),
+}
+CATEGORY_STYLES = {
+    'tops': ('casual', 'smart'), 'bottoms': ('casual', 'smart'), 'outerwear': ('casual', 'smart'),
+    'dresses': ('smart', 'formal'), 'footwear': ('casual', 'smart'), 'accessories': ('casual', 'smart', 'formal'),
+}
+
+# Occasion keyword -> styles that suit it
+OCCASION_STYLES = {
+    'wedding': ('formal',), 'gala': ('formal',), 'funeral': ('formal',), 'formal': ('formal',),
+    'interview': ('formal', 'smart'), 'office': ('smart', 'formal'), 'work': ('smart', 'formal'),
+    'meeting': ('smart', 'formal'), 'dinner': ('smart',), 'date': ('smart', 'casual'),
+    'party': ('smart', 'casual'), 'smart': ('smart',),
+    'gym': ('sporty',), 'workout': ('sporty',), 'run': ('sporty',), 'sport': ('sporty',), 'sporty': ('sporty',),
+    'weekend': ('casual',), 'brunch': ('casual', 'smart'), 'beach': ('casual',), 'casual': ('casual',),
+}
+
+# Outfit shapes: required core slots; the optional slots are added when they improve the score
+TEMPLATES = (('tops', 'bottoms'), ('dresses',))
+OPTIONAL_SLOTS = ('footwear', 'outerwear', 'accessories')
+
+
+def _style_mask(styles):
+    mask = 0
+    for style in styles:
+        mask |= _STYLE_BIT[style]
+    return mask
+
+
+# Compatibility table over every pair of style masks: items sharing a style go together fully,
+# items with no style in common (a suit with sneakers) are penalized.
+STYLE_COMPATIBILITY = [
+    [1.0 if (a & b) or not a or not b else 0.4 for b in range(1 << len(STYLES))]
+    for a in range(1 << len(STYLES))
+]
+
+
+def parse_request(command):
+    """Returns (occasion or None, color or None) mentioned in a free-text command."""
+    text = ' ' + re.sub(r'[^a-z\s-]', ' ', command.lower()) + ' '
+    occasion = next((word for word in OCCASION_STYLES if f' {word} ' in text or f' {word}s ' in text), None)
+    # Longest names first so 'navy blue' wins over 'blue'
+    color = next((name for name in sorted(PALETTE_NAMES, key=len, reverse=True) if f' {name} ' in text), None)
+    return occasion, color
+
+
+class ItemClass:
+    """All wardrobe items with the same label and color; outfits are built from these, not single items."""
+    __slots__ = ('label', 'color', 'category', 'count', 'color_index', 'style_mask')
+
+    def __init__(self, label, color, count):
+        self.label = label
+        self.color = color if color in COLOR_INDEX else 'unknown'
+        self.category = categorize_label(label)
+        self.count = count
+        self.color_index = COLOR_INDEX[self.color]
+        self.style_mask = _style_mask(LABEL_STYLES.get(label.lower(), CATEGORY_STYLES.get(self.category, ())))
+
+    def describe(self):
+        return self.label if self.color == 'unknown' else f"{self.color} {self.label}"
+
+
+def pair_score(a, b):
+    return HARMONY_MATRIX[a.color_index][b.color_index] * STYLE_COMPATIBILITY[a.style_mask][b.style_mask]
+
+
+class OutfitEngine:
+    """
+    Indexes the wardrobe by category and style and enumerates the best outfits for an occasion.
+    Identical items are grouped into classes first and each slot keeps only its best few classes,
+    so a wardrobe of thousands of items costs about as much as one of a few dozen.
+    """
+
+    def __init__(self, beam_width=BEAM_WIDTH, classes_per_slot=CLASSES_PER_SLOT):
+        self.beam_width = beam_width
+        self.classes_per_slot = classes_per_slot
+        self.version = None
+        self._by_category = {}  # category -> [ItemClass]
+        self._lock = threading.Lock()
+
+    def update(self, version, item_classes):
+        """Rebuilds the index from (label, color, count) tuples, unless 'version' is already indexed."""
+        with self._lock:
+            if version is not None and version == self.version:
+                return
+            by_category = {}
+            for label, color, count in item_classes:
+                item = ItemClass(label or 'unknown item', color or 'unknown', count)
+                if item.category != 'other':
+                    by_category.setdefault(item.category, []).append(item)
+            self._by_category = by_category
+            self.version = version
+
+    def _fit(self, item, style_mask, color):
+        """How well one item suits the request on its own."""
+        fit = 1.0 if not style_mask or item.style_mask & style_mask else 0.3
+        if color and item.color == color:
+            fit += COLOR_BONUS
+        return fit
+
+    def _slot_options(self, category, style_mask, color):
+        items = self._by_category.get(category, ())
+        ranked = heapq.nlargest(self.classes_per_slot, items,
+                                key=lambda item: (self._fit(item, style_mask, color), item.count))
+        return [(item, self._fit(item, style_mask, color)) for item in ranked]
+
+    @staticmethod
+    def _score(fit_sum, pair_sum, size):
+        pairs = size * (size - 1) / 2
+        return 0.4 * fit_sum / size + 0.6 * (pair_sum / pairs if pairs else 0.5) + COMPLETENESS_BONUS * (size - 1)
+
+    def recommend(self, occasion=None, color=None, top_k=DEFAULT_TOP_K):
+        """
+        Returns up to top_k outfits as dicts: 'items' (ItemClass list), 'score' and 'scheme'.
+        Beam search over the template slots: every partial outfit keeps running sums of item fit
+        and pairwise compatibility, so extending it by one item costs one lookup per item already in it.
+        """
+        style_mask = _style_mask(OCCASION_STYLES.get(occasion, ()))
+        with self._lock:
+            options = {category: self._slot_options(category, style_mask, color)
+                       for category in set(sum(TEMPLATES, ())) | set(OPTIONAL_SLOTS)}
+
+        finished = []
+        for template in TEMPLATES:
+            beam = [((), 0.0, 0.0)]  # (items, fit_sum, pair_sum)
+            for slot in template + OPTIONAL_SLOTS:
+                if not options[slot]:
+                    if slot in template:
+                        beam = []
+                        break
+                    continue
+                extended = [] if slot in template else list(beam)
+                for items, fit_sum, pair_sum in beam:
+                    for item, fit in options[slot]:
+                        extended.append((items + (item,), fit_sum + fit,
+                                         pair_sum + sum(pair_score(item, other) for other in items)))
+                beam = heapq.nlargest(self.beam_width, extended,
+                                      key=lambda state: self._score(state[1], state[2], len(state[0])))
+            finished.extend(beam)
+
+        ranked = sorted((state for state in finished if state[0]),
+                        key=lambda state: self._score(state[1], state[2], len(state[0])), reverse=True)
+        # Prefer outfits that differ in more than one item from those already picked, then fill up
+        picked = []
+        for near_duplicates_ok in (False, True):
+            for state in ranked:
+                if len(picked) == top_k:
+                    break
+                items = set(map(id, state[0]))
+                if any(items == set(map(id, other[0])) or
+                       (not near_duplicates_ok and len(items & set(map(id, other[0]))) >= len(items) - 1)
+                       for other in picked):
+                    continue
+                picked.append(state)
+        return [{'items': list(items), 'score': round(self._score(fit_sum, pair_sum, len(items)), 3),
+                 'scheme': _outfit_scheme(items)} for items, fit_sum, pair_sum in picked]
+
+
+def _outfit_scheme(items):
+    """The color scheme that best describes an outfit (its most common non-neutral relation)."""
+    schemes = [HARMONY_SCHEME[a.color_index][b.color_index] for i, a in enumerate(items) for b in items[i + 1:]
+               if not (a.color in NEUTRAL_COLORS and b.color in NEUTRAL_COLORS)]
+    for scheme in ('complementary', 'analogous', 'monochrome', 'clash', 'neutral'):
+        if scheme in schemes:
+            return scheme
+    return 'neutral'
+
+
+def format_candidates(outfits):
+    """One line per outfit, for the model prompt."""
+    return "\n".join(
+        f"{i}. {', '.join(item.describe() for item in outfit['items'])} ({outfit['scheme']}, score {outfit['score']})"
+        for i, outfit in enumerate(outfits, 1)
+    )
+
+
+def candidates_digest(outfits):
+    """One line standing in for the candidate list in the conversation history (the answer says the rest)."""
+    best = ', '.join(item.describe() for item in outfits[0]['items'])
+    return f"{len(outfits)} candidate outfits were listed; the best was: {best}."
+
+
+def offline_answer(outfits, occasion=None):
+    """A spoken answer built from the candidates alone, for when the model cannot be reached."""
+    if not outfits:
+        return None
+    for_occasion = f" for the {occasion}" if occasion else ""
+    first = outfits[0]
+    answer = (f"Here's what I'd pick from your wardrobe{for_occasion}: "
+              f"{_join(first['items'])}. It's a {first['scheme']} color pairing, so it looks put together.")
+    if len(outfits) > 1:
+        answer += f" Another option is {_join(outfits[1]['items'])}."
+    return answer
+
+
+def _join(items):
+    names = [f"the {item.describe()}" for item in items]
+    return names[0] if len(names) == 1 else ", ".join(names[:-1]) + " and " + names[-1]
+
+
+_shared_engine = None
+_shared_lock = threading.Lock()
+
+
+def get_outfit_engine():
+    """Returns the process-wide outfit engine (its index is rebuilt only when the wardrobe version moves)."""
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = OutfitEngine()
+        return _shared_engine
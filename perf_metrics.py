@@ -0,0 +1,188 @@
+# perf_metrics.py (Per-stage latency histograms, counters and rates for the live pipeline)
+"""
+Lightweight instrumentation for the vision, stylist, voice and wardrobe hot paths.
+
+    with perf_metrics.stage('vision.draw'):
+        ...
+    perf_metrics.count('vision.dropped_frames')
+    perf_metrics.tick('vision.recv_fps')
+
+Enable with MIRA_PERF_METRICS=1. When disabled, stage() hands back one shared no-op context
+manager and count()/tick()/record() return immediately, so the cost is a function call.
+MIRA_PERF_EXPORT=<path> writes the final snapshot as JSON when the process exits.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# --- Configuration ---
+PERF_METRICS = os.getenv('MIRA_PERF_METRICS', '0') == '1'
+PERF_EXPORT_FILE = os.getenv('MIRA_PERF_EXPORT')
+# Samples kept per stage for the percentiles (the most recent ones)
+HISTOGRAM_SAMPLES = 2048
+# Window for the event rates (FPS)
+RATE_WINDOW_SECONDS = 5.0
+PERCENTILES = (50, 95, 99)
+
+_enabled = PERF_METRICS
+_lock = threading.Lock()
+_stages = {}    # name -> StageStats
+_counters = {}  # name -> int
+_rates = {}     # name -> deque of event times
+
+
+class StageStats:
+    """Latency samples for one stage: totals since start plus a window of recent samples."""
+    __slots__ = ('count', 'total', 'max', 'samples')
+
+    def __init__(self, size=HISTOGRAM_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        result = {'count': self.count, 'mean_ms': self.total / self.count * 1000 if self.count else 0.0,
+                  'max_ms': self.max * 1000}
+        for p in PERCENTILES:
+            result[f'p{p}_ms'] = ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1000 if ordered else 0.0
+        return result
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(value):
+    """Turns collection on or off at runtime (e.g. for benchmarks)."""
+    global _enabled
+    _enabled = bool(value)
+
+
+def stage(name):
+    """Context manager timing one execution of stage 'name'."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def record(name, seconds):
+    """Adds one latency sample (in seconds) to stage 'name'."""
+    if not _enabled:
+        return
+    with _lock:
+        stats = _stages.get(name)
+        if stats is None:
+            stats = _stages[name] = StageStats()
+        stats.add(seconds)
+
+
+def count(name, n=1):
+    """Increments counter 'name' (dropped frames, cache hits, ...)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def tick(name):
+    """Marks one event for rate 'name' (frames for FPS, ...)."""
+    if not _enabled:
+        return
+    now = time.perf_counter()
+    with _lock:
+        events = _rates.get(name)
+        if events is None:
+            events = _rates[name] = deque()
+        events.append(now)
+        while events[0] < now - RATE_WINDOW_SECONDS:
+            events.popleft()
+
+
+def _rate(events, now):
+    recent = [t for t in events if t >= now - RATE_WINDOW_SECONDS]
+    if len(recent) < 2:
+        return 0.0
+    span = now - recent[0]
+    return (len(recent) - 1) / span if span > 0 else 0.0
+
+
+def snapshot():
+    """Returns everything collected so far as plain dicts (stage latencies in ms, rates per second)."""
+    now = time.perf_counter()
+    with _lock:
+        return {
+            'enabled': _enabled,
+            'stages': {name: stats.summary() for name, stats in sorted(_stages.items())},
+            'counters': dict(sorted(_counters.items())),
+            'rates': {name: round(_rate(events, now), 2) for name, events in sorted(_rates.items())},
+        }
+
+
+def export_json(path=None):
+    """Returns the snapshot as JSON, also writing it to 'path' if given."""
+    payload = json.dumps(snapshot(), indent=2)
+    if path:
+        with open(path, 'w') as f:
+            f.write(payload)
+    return payload
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+        _rates.clear()
+
+
+def format_table():
+    """Plain-text table of the stage latencies, for logs and the sidebar."""
+    stats = snapshot()['stages']
+    if not stats:
+        return "(no samples yet)"
+    width = max(len(name) for name in stats) + 2
+    lines = [f"{'stage':<{width}}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}"]
+    for name, s in stats.items():
+        lines.append(f"{name:<{width}}{s['count']:>7}{s['p50_ms']:>9.2f}{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}")
+    return "\n".join(lines)
+
+
+if PERF_METRICS and PERF_EXPORT_FILE:
+    atexit.register(export_json, PERF_EXPORT_FILE)
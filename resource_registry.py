@@ -0,0 +1,256 @@
+# resource_registry.py (Process-wide heavy resources shared by every Streamlit session)
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from startup_profile import PROFILE_STARTUP, format_startup_profile, profile_step, timed_import
+
+# Number of MediaPipe Hands tracking graphs, each pinned to one session (default: one per core, at most 4).
+# Further sessions share a static-image graph.
+HANDS_POOL_SIZE = int(os.getenv('MIRA_HANDS_POOL_SIZE', min(os.cpu_count() or 1, 4)))
+# A session that sent no frame for this long loses its pinned graph to a waiting session
+HANDS_PIN_IDLE_SECONDS = float(os.getenv('MIRA_HANDS_PIN_IDLE', '30'))
+
+# Gemini requests taking longer than this fail, and the stylist answers from the local outfit engine instead
+GEMINI_TIMEOUT_SECONDS = float(os.getenv('MIRA_GEMINI_TIMEOUT', '20'))
+# Alternative API endpoints (proxies, or the local stand-ins in benchmarks/fake_servers.py); unset = the real APIs
+GEMINI_BASE_URL = os.getenv('MIRA_GEMINI_BASE_URL')
+ELEVEN_BASE_URL = os.getenv('MIRA_ELEVEN_BASE_URL')
+
+# Subsystems loaded in the background: name -> (heavy third-party imports, our module).
+# The dependencies are imported one by one first so the startup profile shows each of them.
+SUBSYSTEMS = {
+    'vision': (('numpy', 'cv2', 'mediapipe'), 'vision_module'),
+    'voice': (('speech_recognition', 'elevenlabs', 'sounddevice'), 'voice_module'),
+    'stylist': (('google.genai',), 'ai_stylist_module'),
+}
+
+_lock = threading.Lock()
+_load_lock = threading.Lock()
+_genai_clients = {}
+_elevenlabs_clients = {}
+_hands_pool = None
+_readiness = {name: 'pending' for name in SUBSYSTEMS}
+_modules = {}
+_loader_thread = None
+_prewarm_phrases = []  # canned speech synthesized into the TTS cache while voice loads
+
+
+class HandsPool:
+    """
+    A fixed set of MediaPipe Hands graphs shared across sessions.
+    Tracking (video mode) graphs carry state from one frame to the next, so each is pinned to a
+    single session: its first acquire() claims a free graph and keeps it until release() (called by
+    VisionProcessor.stop() when the stream ends or the worker goes idle). If that never happens, a
+    graph with no frame for HANDS_PIN_IDLE_SECONDS can be claimed by a waiting session. Sessions that
+    find every graph pinned share one static-image graph, which detects from scratch each frame:
+    slower, but it never mixes two users' video streams.
+    """
+
+    def __init__(self, size=HANDS_POOL_SIZE):
+        import mediapipe as mp
+
+        self.size = max(1, size)
+        self._graphs = [
+            mp.solutions.hands.Hands(min_detection_confidence=0.7, min_tracking_confidence=0.5)
+            for _ in range(self.size)
+        ]
+        self._graph_locks = [threading.Lock() for _ in range(self.size)]
+        self._static = mp.solutions.hands.Hands(static_image_mode=True, min_detection_confidence=0.7)
+        self._static_lock = threading.Lock()
+        self._pin_lock = threading.Lock()
+        self._pins = {}        # owner -> slot
+        self._last_used = {}   # slot -> monotonic time of its owner's last inference
+        self._stale = set()    # slots whose tracking state belongs to a previous owner
+
+    @contextmanager
+    def acquire(self, owner=None):
+        """Yields the graph for one inference by 'owner' (one per session): its pinned graph, or the static one."""
+        slot = self._pin(owner) if owner is not None else None
+        if slot is None:
+            with self._static_lock:
+                yield self._static
+            return
+        with self._graph_locks[slot]:
+            with self._pin_lock:
+                stale = slot in self._stale
+                self._stale.discard(slot)
+            if stale:
+                self._graphs[slot].reset()  # start without the previous session's tracking state
+            yield self._graphs[slot]
+
+    def release(self, owner):
+        """Unpins the owner's graph so another session can have it."""
+        with self._pin_lock:
+            slot = self._pins.pop(owner, None)
+            if slot is not None:
+                self._stale.add(slot)
+
+    def pinned(self):
+        with self._pin_lock:
+            return len(self._pins)
+
+    def _pin(self, owner):
+        now = time.monotonic()
+        with self._pin_lock:
+            slot = self._pins.get(owner)
+            if slot is None:
+                slot = self._claim_slot(now)
+                if slot is None:
+                    return None
+                self._pins[owner] = slot
+            self._last_used[slot] = now
+            return slot
+
+    def _claim_slot(self, now):
+        """Called with the pin lock held: a free slot, or the one of a session gone idle, or None."""
+        pinned = {slot: owner for owner, slot in self._pins.items()}
+        free = [slot for slot in range(self.size) if slot not in pinned]
+        if free:
+            slot = free[0]
+        else:
+            slot = min(pinned, key=self._last_used.__getitem__)
+            if now - self._last_used[slot] < HANDS_PIN_IDLE_SECONDS:
+                return None
+            del self._pins[pinned[slot]]
+        self._stale.add(slot)
+        return slot
+
+    def warm_up(self, frame_rgb):
+        """Runs one inference through every graph so the first real frame does not pay for it."""
+        for lock, hands in list(zip(self._graph_locks, self._graphs)) + [(self._static_lock, self._static)]:
+            with lock:
+                hands.process(frame_rgb)
+                if hands is not self._static:
+                    hands.reset()
+
+    def close(self):
+        for hands in self._graphs + [self._static]:
+            hands.close()
+
+
+def get_genai_client(api_key):
+    """Returns the shared Gemini client for 'api_key' (its HTTP connection pool is reused by every session)."""
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable not set.")
+    with _lock:
+        if api_key not in _genai_clients:
+            from google import genai
+            from google.genai import types
+            _genai_clients[api_key] = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(base_url=GEMINI_BASE_URL, timeout=int(GEMINI_TIMEOUT_SECONDS * 1000))
+            )
+        return _genai_clients[api_key]
+
+
+def get_elevenlabs_client(api_key):
+    """Returns the shared ElevenLabs client for 'api_key', or None if no key is configured."""
+    if not api_key:
+        return None
+    with _lock:
+        if api_key not in _elevenlabs_clients:
+            from elevenlabs.client import ElevenLabs
+            _elevenlabs_clients[api_key] = ElevenLabs(api_key=api_key, base_url=ELEVEN_BASE_URL)
+        return _elevenlabs_clients[api_key]
+
+
+def get_hands_pool():
+    """Returns the shared MediaPipe Hands pool, building it on first use."""
+    global _hands_pool
+    with _lock:
+        if _hands_pool is None:
+            _hands_pool = HandsPool()
+        return _hands_pool
+
+
+def _warm_up_hands(pool):
+    """Runs one dummy inference through each graph so the first real frame does not pay for it."""
+    import numpy as np
+
+    pool.warm_up(np.zeros((240, 320, 3), dtype=np.uint8))
+
+
+def _init_subsystem(name, module):
+    """Builds (and warms up) the shared resources a subsystem needs."""
+    if name == 'vision':
+        with profile_step("init hands pool"):
+            pool = get_hands_pool()
+        with profile_step("warm up hands pool"):
+            _warm_up_hands(pool)
+    elif name == 'voice':
+        with profile_step("init elevenlabs client"):
+            client = get_elevenlabs_client(module.ELEVEN_API_KEY)
+        # Once per process and before voice is ready, so no session speaks a canned phrase
+        # while it is still being synthesized (cached phrases are skipped: restarts cost nothing)
+        with profile_step("prewarm tts cache"):
+            module.prewarm_tts_cache(_prewarm_phrases, client)
+    elif name == 'stylist':
+        voice = _modules.get('voice')
+        if voice is not None:
+            # Only spoken when Gemini fails, so it need not hold up startup
+            threading.Thread(target=voice.prewarm_tts_cache, name="mira-tts-prewarm", daemon=True,
+                             args=([module.FALLBACK_RESPONSE], get_elevenlabs_client(voice.ELEVEN_API_KEY))).start()
+        if not module.GEMINI_API_KEY:
+            # Still ready: without a key the stylist answers from the local outfit engine
+            print("WARNING: GEMINI_API_KEY not found. The stylist will answer offline.")
+            return
+        with profile_step("init genai client"):
+            get_genai_client(module.GEMINI_API_KEY)
+
+
+def _set_state(name, state):
+    with _lock:
+        _readiness[name] = state
+
+
+def load_subsystems():
+    """
+    Imports every subsystem (heavy dependencies first, each timed) and builds its shared
+    resources. Blocking; failures are recorded in readiness() instead of raised.
+    Only the first call does any work.
+    """
+    with _load_lock:
+        for name, (dependencies, module_name) in SUBSYSTEMS.items():
+            if _readiness[name] != 'pending':
+                continue
+            _set_state(name, 'loading')
+            try:
+                for dependency in dependencies:
+                    timed_import(dependency)
+                module = timed_import(module_name)
+                _init_subsystem(name, module)
+            except Exception as e:
+                print(f"Failed to load {name} subsystem: {e}")
+                _set_state(name, f"failed: {e}")
+                continue
+            _modules[name] = module
+            _set_state(name, 'ready')
+
+        if PROFILE_STARTUP:
+            print("Startup profile:\n" + format_startup_profile())
+
+
+def start_background_loading(prewarm_phrases=()):
+    """
+    Starts load_subsystems on a daemon thread (idempotent) so the UI can render immediately.
+    'prewarm_phrases' (e.g. the welcome message) are put in the TTS cache before voice is ready.
+    """
+    global _loader_thread
+    with _lock:
+        if _loader_thread is None:
+            _prewarm_phrases.extend(prewarm_phrases)
+            _loader_thread = threading.Thread(target=load_subsystems, name="mira-loader", daemon=True)
+            _loader_thread.start()
+
+
+def readiness():
+    """Returns subsystem -> 'pending' | 'loading' | 'ready' | 'failed: <reason>'."""
+    with _lock:
+        return dict(_readiness)
+
+
+def get_module(name):
+    """Returns the loaded module for a subsystem, or None if it is not ready (yet)."""
+    return _modules.get(name)
@@ -0,0 +1,133 @@
+# response_cache.py (LRU + TTL cache for stylist answers)
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+RESPONSE_CACHE_SIZE = int(os.getenv('MIRA_RESPONSE_CACHE_SIZE', '256'))
+RESPONSE_CACHE_TTL = float(os.getenv('MIRA_RESPONSE_CACHE_TTL', '3600'))  # seconds
+# Optional JSON file the cache is persisted to (unset = memory only)
+RESPONSE_CACHE_FILE = os.getenv('MIRA_RESPONSE_CACHE_FILE')
+
+# Filler words that do not change what the user is asking for.
+# Negations ('not', 'no', 'without') are deliberately kept.
+STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'i', 'me', 'my', 'you', 'your', 'we', 'to', 'for', 'of', 'on', 'in', 'at',
+    'and', 'or', 'is', 'are', 'am', 'be', 'do', 'does', 'should', 'could', 'would', 'can', 'will',
+    'what', 'which', 'please', 'mira', 'hey', 'hi', 'some', 'any', 'it', 'this', 'that', 'so', 'just',
+})
+
+_PUNCTUATION = re.compile(r"[^\w\s'-]")
+
+
+def normalize_command(command):
+    """Lower-cases, strips punctuation and filler words, so near-identical questions share a key."""
+    words = _PUNCTUATION.sub(' ', command.lower()).split()
+    kept = [word.strip("'-") for word in words if word not in STOP_WORDS]
+    return ' '.join(word for word in kept if word)
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-entry TTL, hit/miss counters and optional JSON persistence."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl_seconds=RESPONSE_CACHE_TTL, path=RESPONSE_CACHE_FILE):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (stored_at, response)
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    @staticmethod
+    def make_key(command, live_status, wardrobe_hash):
+        """Cache key from the normalized command, the live vision status and the wardrobe content hash."""
+        raw = '\x1f'.join((normalize_command(command), live_status or '', wardrobe_hash or ''))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Returns the cached response for 'key', or None (expired entries count as misses)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.time(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            if self.path:
+                self._save()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        now = time.time()
+        for key, stored_at, response in stored:
+            if now - stored_at <= self.ttl_seconds:
+                self._entries[key] = (stored_at, response)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        """Writes the entries (oldest first) atomically; called with the lock held."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.response-cache-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump([[key, stored_at, response] for key, (stored_at, response) in self._entries.items()], f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Could not persist response cache: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Returns the process-wide response cache (shared by every session's stylist)."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
@@ -0,0 +1,291 @@
+# speech_listener.py (Continuous listening: energy VAD segmentation + recognition worker pool)
+import json
+import os
+import queue
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import speech_recognition as sr
+
+# --- Configuration ---
+LISTEN_SAMPLE_RATE = 16000
+FRAME_MS = 30                   # VAD decision granularity
+CALIBRATION_SECONDS = 1.0       # noise floor measured once at start-up...
+RECALIBRATE_SECONDS = 60.0      # ...and refreshed from silent frames this often
+THRESHOLD_RATIO = 3.0           # speech = frame energy above noise floor x this ratio
+MIN_THRESHOLD = 200.0           # RMS floor so a silent room does not make every click "speech"
+START_FRAMES = 3                # consecutive voiced frames that open an utterance
+HANGOVER_MS = 600               # silence that closes an utterance
+PRE_ROLL_MS = 300               # audio kept from before the start trigger
+MIN_UTTERANCE_MS = 300
+MAX_UTTERANCE_SECONDS = 10.0    # same limit as listen_for_command's phrase_time_limit
+ECHO_TAIL_MS = 500              # audio still ignored after Mira stops talking (speaker/room echo)
+RECOGNITION_WORKERS = 2
+# 'google' (remote) or an offline backend supported by speech_recognition: 'sphinx', 'vosk', 'whisper'
+SPEECH_BACKEND = os.getenv('MIRA_SPEECH_BACKEND', 'google')
+
+RECOGNIZERS = {
+    'google': 'recognize_google',
+    'sphinx': 'recognize_sphinx',
+    'vosk': 'recognize_vosk',
+    'whisper': 'recognize_whisper',
+}
+
+
+class MicrophoneSource:
+    """Yields 16-bit mono PCM frames from the default input device (sounddevice)."""
+
+    def __init__(self, sample_rate=LISTEN_SAMPLE_RATE, frame_ms=FRAME_MS):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(sample_rate * frame_ms / 1000) * 2
+        self._stop = threading.Event()
+
+    def frames(self):
+        import sounddevice as sd
+
+        blocksize = self.frame_bytes // 2
+        with sd.RawInputStream(samplerate=self.sample_rate, channels=1, dtype='int16', blocksize=blocksize) as stream:
+            while not self._stop.is_set():
+                data, _overflowed = stream.read(blocksize)
+                yield bytes(data)
+
+    def stop(self):
+        self._stop.set()
+
+
+class WavFileSource:
+    """Yields frames from a recorded 16-bit WAV file (stereo is mixed down), for tests and benchmarks."""
+
+    def __init__(self, path, frame_ms=FRAME_MS, realtime=False):
+        self.path = path
+        self.frame_ms = frame_ms
+        self.realtime = realtime
+        with wave.open(path, 'rb') as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit PCM WAV files are supported.")
+            self.sample_rate = wav.getframerate()
+            self.channels = wav.getnchannels()
+        self.frame_bytes = int(self.sample_rate * frame_ms / 1000) * 2
+        self._stop = threading.Event()
+
+    def frames(self):
+        samples_per_frame = self.frame_bytes // 2
+        with wave.open(self.path, 'rb') as wav:
+            while not self._stop.is_set():
+                data = wav.readframes(samples_per_frame)
+                if not data:
+                    return
+                if self.channels > 1:
+                    samples = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+                    data = samples.mean(axis=1).astype(np.int16).tobytes()
+                yield data
+                if self.realtime:
+                    time.sleep(self.frame_ms / 1000)
+
+    def stop(self):
+        self._stop.set()
+
+
+class EnergyVAD:
+    """
+    Energy gate that turns a stream of PCM frames into utterances.
+    The noise floor is calibrated once, then refreshed periodically from frames judged silent,
+    so there is no per-command ambient-noise pause.
+    """
+
+    def __init__(self, sample_rate, frame_ms=FRAME_MS):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.noise_floor = None
+        self.threshold = MIN_THRESHOLD
+        self._calibration = []
+        self._calibration_frames = max(1, int(CALIBRATION_SECONDS * 1000 / frame_ms))
+        self._silent_energy = []
+        self._last_calibrated = 0.0
+        self._pre_roll = deque(maxlen=max(1, PRE_ROLL_MS // frame_ms))
+        self._utterance = None
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._hangover_frames = max(1, HANGOVER_MS // frame_ms)
+        self._max_frames = int(MAX_UTTERANCE_SECONDS * 1000 / frame_ms)
+        self._min_frames = max(1, MIN_UTTERANCE_MS // frame_ms)
+        self._elapsed = 0.0
+
+    @staticmethod
+    def energy(frame):
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+    def _set_floor(self, energies):
+        self.noise_floor = float(np.median(energies))
+        self.threshold = max(self.noise_floor * THRESHOLD_RATIO, MIN_THRESHOLD)
+        self._last_calibrated = self._elapsed
+
+    def process(self, frame):
+        """Feeds one frame; returns the PCM of a finished utterance, or None."""
+        self._elapsed += self.frame_ms / 1000
+        level = self.energy(frame)
+
+        if self.noise_floor is None:
+            self._calibration.append(level)
+            if len(self._calibration) >= self._calibration_frames:
+                self._set_floor(self._calibration)
+                self._calibration = []
+            return None
+
+        voiced = level > self.threshold
+        if self._utterance is None:
+            if voiced:
+                self._voiced_run += 1
+                self._pre_roll.append(frame)
+                if self._voiced_run >= START_FRAMES:
+                    self._utterance = list(self._pre_roll)
+                    self._pre_roll.clear()
+                    self._silent_run = 0
+                return None
+            self._voiced_run = 0
+            self._pre_roll.append(frame)
+            self._silent_energy.append(level)
+            if self._elapsed - self._last_calibrated >= RECALIBRATE_SECONDS and self._silent_energy:
+                self._set_floor(self._silent_energy)
+                self._silent_energy = []
+            return None
+
+        self._utterance.append(frame)
+        self._silent_run = 0 if voiced else self._silent_run + 1
+        if self._silent_run >= self._hangover_frames or len(self._utterance) >= self._max_frames:
+            return self._finish()
+        return None
+
+    def discard(self):
+        """Drops the open utterance and the pre-roll (e.g. audio captured while Mira was speaking)."""
+        self._utterance = None
+        self._pre_roll.clear()
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    def flush(self):
+        """Returns any utterance still open at end of stream."""
+        return self._finish() if self._utterance is not None else None
+
+    def _finish(self):
+        frames, self._utterance = self._utterance, None
+        self._voiced_run = 0
+        # Trim the trailing silence the hangover collected.
+        if self._silent_run:
+            frames = frames[:len(frames) - self._silent_run] or frames
+        self._silent_run = 0
+        if len(frames) < self._min_frames:
+            return None
+        return b"".join(frames)
+
+
+class ContinuousListener:
+    """
+    Reads frames from a source on one thread, segments them with EnergyVAD and hands every
+    finished utterance to a pool of recognition workers. Transcripts are passed to
+    on_command(text) and also put on the 'results' queue.
+    While is_muted() is true (Mira is speaking) and for ECHO_TAIL_MS after, frames are dropped,
+    so her own voice coming back through the microphone never becomes a command.
+    """
+
+    def __init__(self, source, on_command=None, backend=SPEECH_BACKEND, workers=RECOGNITION_WORKERS,
+                 recognizer=None, is_muted=None):
+        if backend not in RECOGNIZERS:
+            raise ValueError(f"Unknown speech backend '{backend}'. Choose one of: {', '.join(RECOGNIZERS)}.")
+        self.source = source
+        self.on_command = on_command
+        self.backend = backend
+        self.recognizer = recognizer or sr.Recognizer()
+        self.vad = EnergyVAD(source.sample_rate, source.frame_ms)
+        self.is_muted = is_muted
+        self._tail_frames = max(1, ECHO_TAIL_MS // source.frame_ms)
+        self._muted_frames_left = 0
+        self.results = queue.Queue()
+        self.utterances = 0
+        self.muted_frames = 0
+        self._collected = None  # futures, when transcribe_all is collecting them
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mira-stt")
+        self._thread = None
+
+    def start(self):
+        """Starts listening on a background thread (idempotent)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="mira-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.source.stop()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._pool.shutdown(wait=False)
+
+    def run(self):
+        """Consumes the source until it ends or stop() is called (blocking)."""
+        for frame in self.source.frames():
+            if self._muted():
+                continue
+            utterance = self.vad.process(frame)
+            if utterance is not None:
+                self._submit(utterance)
+        utterance = self.vad.flush()
+        if utterance is not None:
+            self._submit(utterance)
+
+    def _muted(self):
+        """True while playback is active and for the echo tail after it; drops what was captured meanwhile."""
+        if self.is_muted is not None and self.is_muted():
+            self._muted_frames_left = self._tail_frames
+        elif self._muted_frames_left:
+            self._muted_frames_left -= 1
+        else:
+            return False
+        self.muted_frames += 1
+        self.vad.discard()
+        return True
+
+    def transcribe_all(self):
+        """Runs the whole source synchronously and returns the transcripts in order (for WAV files)."""
+        self._collected = []
+        try:
+            self.run()
+            return [text for text in (future.result() for future in self._collected) if text]
+        finally:
+            self._collected = None
+
+    def _submit(self, pcm):
+        self.utterances += 1
+        future = self._pool.submit(self._recognize, pcm)
+        if self._collected is not None:
+            self._collected.append(future)
+
+    def _recognize(self, pcm):
+        audio = sr.AudioData(pcm, self.source.sample_rate, 2)
+        try:
+            text = getattr(self.recognizer, RECOGNIZERS[self.backend])(audio)
+        except sr.UnknownValueError:
+            return None
+        except sr.RequestError as e:
+            print(f"Speech recognition service error; {e}")
+            return None
+        except Exception as e:
+            print(f"Speech recognition error ({self.backend}): {e}")
+            return None
+        if isinstance(text, str) and text.startswith('{'):  # vosk returns its raw JSON result
+            text = json.loads(text).get('text', '')
+        elif isinstance(text, dict):
+            text = text.get('text', '')
+        text = (text or '').strip()
+        if not text:
+            return None
+        print(f"User said: **{text}**")
+        self.results.put(text)
+        if self.on_command:
+            self.on_command(text)
+        return text
@@ -0,0 +1,96 @@
+# startup_profile.py (Per-import and per-initialization startup timings)
+"""
+Records how long each startup step takes (imports, model loads, client setup).
+Timings are always collected (a perf_counter call per step); set MIRA_PROFILE_STARTUP=1
+to print the report once loading finishes and to show it in the app sidebar.
+
+Run it standalone to profile a cold start without Streamlit and catch regressions:
+
+    python startup_profile.py [--json] [--max-seconds 8]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_STARTUP = os.getenv('MIRA_PROFILE_STARTUP', '0') == '1'
+
+_lock = threading.Lock()
+_steps = []  # (name, seconds, ok) in completion order
+
+
+@contextmanager
+def profile_step(name):
+    """Times the enclosed block and records it under 'name' (also when it raises)."""
+    start = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        with _lock:
+            _steps.append((name, time.perf_counter() - start, ok))
+
+
+def timed_import(module_name):
+    """Imports 'module_name', recording how long it took. Returns the module."""
+    import importlib
+
+    with profile_step(f"import {module_name}"):
+        return importlib.import_module(module_name)
+
+
+def get_startup_profile():
+    """Returns the recorded steps as a list of dicts, slowest first."""
+    with _lock:
+        steps = list(_steps)
+    return [
+        {'step': name, 'seconds': round(seconds, 4), 'ok': ok}
+        for name, seconds, ok in sorted(steps, key=lambda step: step[1], reverse=True)
+    ]
+
+
+def format_startup_profile():
+    """Returns the profile as a plain-text table."""
+    lines = [f"{'step':<40}{'seconds':>10}"]
+    for step in get_startup_profile():
+        marker = '' if step['ok'] else '  (failed)'
+        lines.append(f"{step['step']:<40}{step['seconds']:>10.3f}{marker}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile a cold MiraAI start (imports and model initialization).")
+    parser.add_argument('--json', action='store_true', help="Emit the profile as JSON.")
+    parser.add_argument('--max-seconds', type=float,
+                        help="Exit with status 1 if the total startup time exceeds this budget.")
+    args = parser.parse_args()
+
+    # Run as a script this file is __main__; use the importable module so we read
+    # the same step list resource_registry records into.
+    import resource_registry
+    import startup_profile
+
+    total_start = time.perf_counter()
+    resource_registry.load_subsystems()
+    total = time.perf_counter() - total_start
+
+    if args.json:
+        print(json.dumps({'total_seconds': round(total, 4), 'readiness': resource_registry.readiness(),
+                          'steps': startup_profile.get_startup_profile()}, indent=2))
+    else:
+        print(startup_profile.format_startup_profile())
+        print(f"\nTotal: {total:.3f}s")
+        for name, state in resource_registry.readiness().items():
+            print(f"  {name}: {state}")
+
+    if args.max_seconds is not None and total > args.max_seconds:
+        print(f"Startup took {total:.3f}s, over the {args.max_seconds:.3f}s budget.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
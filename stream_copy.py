@@ -0,0 +1,34 @@
+# stream_copy.py (Pass-through copy of a chunk stream, for caching what was streamed)
+import time
+
+
+class StreamCopy:
+    """
+    Passes the chunks of a stream through unchanged while keeping a copy of them, so the whole
+    response can be cached once the stream ends. With a 'limit' (in len() units) the copy is
+    dropped as soon as it grows past it: a response too big to cache is never held in memory.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.overflowed = False
+        self.first_chunk_at = None  # perf_counter() time the first chunk arrived
+
+    def tee(self, chunks):
+        for chunk in chunks:
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.perf_counter()
+            if not self.overflowed:
+                self.size += len(chunk)
+                if self.limit is not None and self.size > self.limit:
+                    self.overflowed = True
+                    self.parts = []
+                else:
+                    self.parts.append(chunk)
+            yield chunk
+
+    def joined(self, empty=b""):
+        """The whole stream, or None if it was over the limit."""
+        return None if self.overflowed else empty.join(self.parts)
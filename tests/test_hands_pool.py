@@ -0,0 +1,52 @@
+# tests/test_hands_pool.py (Pinned MediaPipe graphs go back to the pool when a session ends)
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("mediapipe")
+
+from resource_registry import HandsPool  # noqa: E402
+from vision_module import VisionProcessor  # noqa: E402
+
+
+@pytest.fixture
+def pool():
+    pool = HandsPool(size=1)
+    yield pool
+    pool.close()
+
+
+def test_released_graph_goes_to_the_next_session(pool):
+    first, second = object(), object()
+    with pool.acquire(first) as hands:
+        pinned_graph = hands
+    # Every tracking graph is taken: the second session falls back to the shared static graph
+    with pool.acquire(second) as hands:
+        assert hands is not pinned_graph
+
+    pool.release(first)
+
+    with pool.acquire(second) as hands:
+        assert hands is pinned_graph
+    assert pool.pinned() == 1
+
+
+def test_stopping_a_processor_unpins_its_graph(pool):
+    processor = VisionProcessor(hands_pool=pool)
+    processor.next_frame_due()  # starts the worker, like the first WebRTC frame
+    processor.submit_rgb(np.zeros((120, 160, 3), np.uint8))
+    deadline = time.monotonic() + 10
+    while pool.pinned() == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.pinned() == 1
+
+    processor.stop()
+
+    assert pool.pinned() == 0
+    with pool.acquire(object()) as hands:
+        assert hands is not pool._static
@@ -0,0 +1,170 @@
+# tests/test_speech_listener.py (Continuous listening: WAV segmentation, and never hearing Mira's own voice)
+import os
+import sys
+import threading
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speech_listener import (  # noqa: E402
+    CALIBRATION_SECONDS, ECHO_TAIL_MS, FRAME_MS, MIN_THRESHOLD, PRE_ROLL_MS, THRESHOLD_RATIO, ContinuousListener,
+    WavFileSource,
+)
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+
+def frame(amplitude):
+    """One FRAME_MS frame of a 220 Hz tone (speech-level energy) or near silence."""
+    t = np.arange(FRAME_SAMPLES) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.int16).tobytes()
+
+
+def frames_for(ms, amplitude):
+    return [frame(amplitude) for _ in range(ms // FRAME_MS)]
+
+
+class ListSource:
+    sample_rate = SAMPLE_RATE
+    frame_ms = FRAME_MS
+
+    def __init__(self, frames):
+        self._frames = frames
+
+    def frames(self):
+        yield from self._frames
+
+    def stop(self):
+        pass
+
+
+class EchoRecognizer:
+    """Recognizes every utterance as the same phrase (no network)."""
+
+    def recognize_google(self, audio):
+        return "that navy look is a great base"
+
+
+class FakePlayback:
+    """is_muted callable that reports playback for the frames in [start, end)."""
+
+    def __init__(self, start, end):
+        self.start, self.end = start, end
+        self.frame = -1
+
+    def __call__(self):
+        self.frame += 1
+        return self.start <= self.frame < self.end
+
+
+def run_listener(frames, is_muted=None):
+    commands = []
+    listener = ContinuousListener(ListSource(frames), on_command=commands.append,
+                                  recognizer=EchoRecognizer(), is_muted=is_muted)
+    listener.transcribe_all()
+    listener.stop()
+    return commands, listener
+
+
+def test_speech_during_playback_fires_no_command():
+    calibration = frames_for(int(CALIBRATION_SECONDS * 1000), 20)
+    # Mira talks for 2 s (picked up loudly by the mic), then a short silence
+    playback = frames_for(2000, 6000)
+    after = frames_for(1500, 20)
+    player = FakePlayback(len(calibration), len(calibration) + len(playback))
+
+    commands, listener = run_listener(calibration + playback + after, is_muted=player)
+
+    assert commands == []
+    assert listener.utterances == 0
+    assert listener.muted_frames >= len(playback) + ECHO_TAIL_MS // FRAME_MS
+
+
+def test_echo_tail_is_dropped_after_playback():
+    calibration = frames_for(int(CALIBRATION_SECONDS * 1000), 20)
+    playback = frames_for(1000, 6000)
+    # Room echo right after the speaker stops, shorter than the tail
+    echo = frames_for(ECHO_TAIL_MS - FRAME_MS, 6000)
+    after = frames_for(1500, 20)
+    player = FakePlayback(len(calibration), len(calibration) + len(playback))
+
+    commands, _ = run_listener(calibration + playback + echo + after, is_muted=player)
+
+    assert commands == []
+
+
+def test_user_speech_after_playback_still_fires():
+    calibration = frames_for(int(CALIBRATION_SECONDS * 1000), 20)
+    playback = frames_for(1000, 6000)
+    tail = frames_for(ECHO_TAIL_MS, 20)
+    speech = frames_for(900, 6000) + frames_for(1500, 20)
+    player = FakePlayback(len(calibration), len(calibration) + len(playback))
+
+    commands, _ = run_listener(calibration + playback + tail + speech, is_muted=player)
+
+    assert commands == ["that navy look is a great base"]
+
+
+class RecordingRecognizer:
+    """Keeps the PCM of every utterance it is asked to recognize (recognition runs on worker threads)."""
+
+    def __init__(self):
+        self.utterances = []
+        self._lock = threading.Lock()
+
+    def recognize_google(self, audio):
+        with self._lock:
+            self.utterances.append(audio.frame_data)
+            return f"utterance {len(self.utterances)}"
+
+
+def write_wav(path, segments, noise_rms=100, seed=0):
+    """
+    Writes a 16 kHz mono WAV from (ms, amplitude) segments: room noise throughout, plus a 220 Hz
+    tone where amplitude > 0. Returns the samples and the (start, end) sample of every tone burst.
+    """
+    rng = np.random.default_rng(seed)
+    parts, bursts, position = [], [], 0
+    for ms, amplitude in segments:
+        count = SAMPLE_RATE * ms // 1000
+        t = np.arange(count) / SAMPLE_RATE
+        parts.append(amplitude * np.sin(2 * np.pi * 220 * t) + rng.normal(0, noise_rms, count))
+        if amplitude:
+            bursts.append((position, position + count))
+        position += count
+    samples = np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16)
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return samples, bursts
+
+
+def test_wav_file_is_segmented_into_utterances(tmp_path):
+    path = tmp_path / "two_commands.wav"
+    # Frame-aligned (multiples of FRAME_MS): quiet room, two spoken bursts, silence after each
+    samples, bursts = write_wav(path, [(1200, 0), (600, 6000), (990, 0), (900, 6000), (990, 0)])
+    recognizer = RecordingRecognizer()
+    listener = ContinuousListener(WavFileSource(str(path)), recognizer=recognizer)
+
+    texts = listener.transcribe_all()
+    listener.stop()
+
+    assert texts == ["utterance 1", "utterance 2"]
+    assert listener.utterances == 2
+    # Noise floor from the first second (room noise only), speech threshold derived from it
+    assert abs(listener.vad.noise_floor - 100) < 15
+    assert listener.vad.threshold == max(listener.vad.noise_floor * THRESHOLD_RATIO, MIN_THRESHOLD)
+
+    pcm = samples.tobytes()
+    segments = sorted((pcm.find(utterance) // 2, (pcm.find(utterance) + len(utterance)) // 2)
+                      for utterance in recognizer.utterances)
+    pre_roll = SAMPLE_RATE * PRE_ROLL_MS // 1000
+    for (start, end), (burst_start, burst_end) in zip(segments, bursts):
+        # Starts a little early (pre-roll), ends where the burst does (trailing silence trimmed)
+        assert burst_start - pre_roll <= start <= burst_start
+        assert end == burst_end
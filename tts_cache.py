@@ -0,0 +1,130 @@
+# tts_cache.py (Size-bounded on-disk cache of synthesized speech as raw PCM)
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# --- Configuration ---
+# Next to the app by default (not the working directory, which depends on where streamlit was started)
+TTS_CACHE_DIR = os.getenv('MIRA_TTS_CACHE_DIR',
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mira_tts_cache'))
+TTS_CACHE_MAX_BYTES = int(os.getenv('MIRA_TTS_CACHE_MAX_MB', '64')) * 1024 * 1024
+# Clips larger than this are played but not cached (about 30 s of 22.05 kHz mono PCM)
+TTS_CACHE_MAX_ITEM_BYTES = 30 * 22050 * 2
+
+
+class TTSCache:
+    """
+    Stores decoded PCM per (text, voice_id, model_id, output_format) as one file per clip.
+    Least recently used clips are evicted once the directory exceeds max_bytes.
+    Recency survives restarts through the files' modification times.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, max_item_bytes=TTS_CACHE_MAX_ITEM_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def make_key(text, voice_id, model_id, output_format):
+        raw = json.dumps([text.strip(), voice_id, model_id, output_format])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pcm')
+
+    def _scan(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pcm'):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def get(self, key):
+        """Returns the cached PCM bytes for 'key', or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._path(key))  # mark as recently used for the next process too
+        except OSError:
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, pcm):
+        """Stores a clip (atomically) and evicts old clips to stay under max_bytes."""
+        if not pcm or len(pcm) > self.max_item_bytes:
+            return
+        fd, tmp_path = tempfile.mkstemp(prefix='.tts-', suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pcm)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Could not write TTS cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = len(pcm)
+            self._total_bytes += len(pcm)
+            self._evict()
+
+    def _forget(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._total_bytes,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """Returns the process-wide TTS cache."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = TTSCache()
+        return _shared_cache
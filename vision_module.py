@@ -1,71 +1,336 @@
 # vision_module.py (MediaPipe Hand Tracker)
 import cv2
 import mediapipe as mp
+import math
+import numpy as np
+import os
 import time
 import threading
-import random
 
-# --- Helper Function for Placeholder Color (Still needed for the prompt) ---
-def extract_color(frame, bbox):
-    """Placeholder for actual dominant color extraction logic."""
-    colors = ["red", "black", "white", "navy blue", "beige", "gray", "green"]
-    return random.choice(colors)
+# Dominant color of a detected item (vectorized NumPy + precomputed LAB lookup table)
+from color_module import extract_color
+# Thumbs-up / open palm / swipe from the landmarks MediaPipe already produces
+from gesture_module import (OPEN_PALM, SWIPE_LEFT, SWIPE_RIGHT, THUMBS_UP, GestureRecognizer, held_item_bbox,
+                            held_item_label)
+import perf_metrics
 
 # Initialize MediaPipe Hands
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 
+# Drawing styles for the landmark overlay
+LANDMARK_STYLE = mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2)
+CONNECTION_STYLE = mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2)
+
+# --- Latest-frame inference defaults ---
+# Average inference time we allow per displayed frame. If MediaPipe takes longer,
+# full inference only runs every N frames and the last landmarks are reused in between.
+LATENCY_BUDGET_MS = 20.0
+# Never reuse landmarks for more than this many consecutive frames.
+MAX_FRAME_SKIP = 4
+# The inference worker exits after this long without a frame (stream stopped, tab closed) and
+# gives its pinned hands graph back to the pool; the next frame starts it again.
+WORKER_IDLE_SECONDS = float(os.getenv('MIRA_VISION_IDLE', '10'))
+# Frames wider than this are downscaled before inference (None = native resolution).
+# Hand landmarks are normalized, so they are drawn back at full display resolution.
+INFERENCE_WIDTH = 640
+
 class VisionProcessor:
     """Handles MediaPipe initialization and non-blocking frame processing."""
-    
-    def __init__(self, item_save_callback=None):
+
+    def __init__(self, item_save_callback=None, latency_budget_ms=LATENCY_BUDGET_MS, max_frame_skip=MAX_FRAME_SKIP,
+                 inference_width=INFERENCE_WIDTH, hands_pool=None, next_suggestion_callback=None, stop_callback=None):
         print("Initializing Vision Processor (MediaPipe)...")
+        # Gesture actions (called on the inference thread, so they must not block):
+        #   thumbs-up  -> item_save_callback(item) with the garment held below the hand
+        #   swipe      -> next_suggestion_callback()
+        #   open palm  -> stop_callback(), only after it is held still for OPEN_PALM_HOLD_SECONDS
         self.item_save_callback = item_save_callback
-        self.last_save_time = time.time()
-        self.save_debounce_period = 5 # seconds
-        
-        # New: MediaPipe hands model instance
-        self.hands = mp_hands.Hands(
-            min_detection_confidence=0.7, 
+        self.next_suggestion_callback = next_suggestion_callback
+        self.stop_callback = stop_callback
+        self.last_save_time = 0.0  # so a thumbs-up right after the camera starts is not swallowed
+        self.last_suggestion_time = 0.0
+        self.save_debounce_period = 5 # seconds (also between swipe-triggered suggestions)
+        self.gestures = GestureRecognizer()
+        self.last_gesture = None
+
+        # MediaPipe hands graphs: borrowed from the shared pool (see resource_registry.py)
+        # or, without a pool, a private instance as before.
+        self.hands_pool = hands_pool
+        self._hands_owner = object()  # this session's key for its pinned graph in the pool
+        self.hands = None if hands_pool else mp_hands.Hands(
+            min_detection_confidence=0.7,
             min_tracking_confidence=0.5
         )
-        
+        # The MediaPipe graph is not re-entrant; the worker and process_frame share it.
+        self._hands_lock = threading.Lock()
+
         # New: Variable to store the latest live status (e.g., "HAND DETECTED")
-        self.latest_live_status = "No activity." 
-        
+        self.latest_live_status = "No activity."
+
+        # Frames wider than this are downscaled (aspect preserved) before inference
+        self.inference_width = inference_width
+
+        # (width, height) of the displayed frames; inference runs on a downscaled copy
+        self._display_size = None
+
+        # --- Latest-frame worker state (used by process_video_frame) ---
+        self.latency_budget = latency_budget_ms / 1000.0
+        self.max_frame_skip = max_frame_skip
+        self.infer_every = 1            # current cadence: full inference every N frames
+        self.avg_inference_time = 0.0   # moving average of MediaPipe time per frame (seconds)
+        self.dropped_frames = 0         # frames replaced in the slot before the worker got to them
+        self._frame_index = 0
+        self._latest_landmarks = None
+        self._pending = None            # RGB frame waiting for the worker
+        self._slot = threading.Condition()
+        self._worker = None
+        self._stopping = False
+
+        # --- Preallocated inference buffers (no large per-frame allocations) ---
+        self._buffer_shape = None       # (infer_h, infer_w, frame_h, frame_w) the buffers were sized for
+        self._scaled_bgr = None         # resize target before the color conversion
+        self._sync_rgb = None           # RGB buffer for the synchronous process_frame path
+
         print("Vision Processor Ready.")
 
+    @property
+    def latest_landmarks(self):
+        """Hand landmarks from the most recent finished inference (normalized coordinates)."""
+        return self._latest_landmarks
+
+    def inference_size(self, width, height):
+        """Returns the (width, height) frames of this size are inferred at, keeping the aspect ratio."""
+        if not self.inference_width or width <= self.inference_width:
+            return width, height
+        scale = self.inference_width / width
+        return self.inference_width, max(1, round(height * scale))
+
+    def _ensure_buffers(self, frame):
+        """(Re)allocates the inference buffers when the incoming frame size changes."""
+        height, width = frame.shape[:2]
+        infer_width, infer_height = self.inference_size(width, height)
+        if self._buffer_shape == (infer_height, infer_width, height, width):
+            return
+        self._buffer_shape = (infer_height, infer_width, height, width)
+        needs_resize = (infer_width, infer_height) != (width, height)
+        self._scaled_bgr = np.empty((infer_height, infer_width, 3), np.uint8) if needs_resize else None
+        self._sync_rgb = np.empty((infer_height, infer_width, 3), np.uint8)
+
+    def _to_inference_rgb(self, frame, out):
+        """Downscales (if needed) and converts a BGR frame into the preallocated RGB buffer 'out'."""
+        if self._scaled_bgr is not None:
+            with perf_metrics.stage('vision.resize'):
+                cv2.resize(frame, (out.shape[1], out.shape[0]), dst=self._scaled_bgr, interpolation=cv2.INTER_LINEAR)
+            frame = self._scaled_bgr
+        with perf_metrics.stage('vision.cvt_color'):
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=out)
+        return out
+
+    def _infer(self, frame_rgb):
+        """Runs MediaPipe on an RGB frame, updates the live status and returns the hand landmarks (or None)."""
+        # Landmarks come back normalized to [0, 1], so they map straight onto the full-size
+        # display frame no matter what resolution inference ran at.
+        if self.hands_pool is not None:
+            # The graph pinned to this session, so its tracking state only ever sees our frames.
+            with self.hands_pool.acquire(self._hands_owner) as hands:
+                with perf_metrics.stage('vision.hands_process'):
+                    results = hands.process(frame_rgb)
+        else:
+            with self._hands_lock, perf_metrics.stage('vision.hands_process'):
+                results = self.hands.process(frame_rgb)
+
+        # Update the latest live status for the AI Stylist
+        self.latest_live_status = "Hand detected." if results.multi_hand_landmarks else "No activity."
+        with perf_metrics.stage('vision.gestures'):
+            self._handle_gestures(frame_rgb, results.multi_hand_landmarks)
+        return results.multi_hand_landmarks
+
+    def _handle_gestures(self, frame_rgb, multi_hand_landmarks):
+        """Feeds the first hand to the gesture recognizer and runs the (debounced) action for what fired."""
+        gesture = self.gestures.update(multi_hand_landmarks[0] if multi_hand_landmarks else None)
+        if gesture is None:
+            return
+        self.last_gesture = gesture
+        perf_metrics.count(f'vision.gesture.{gesture}')
+        now = time.time()
+        try:
+            if gesture == THUMBS_UP and self.item_save_callback:
+                if now - self.last_save_time < self.save_debounce_period:
+                    return
+                item = self._held_item(frame_rgb)
+                if item is not None:
+                    self.last_save_time = now
+                    self.item_save_callback(item)
+            elif gesture in (SWIPE_LEFT, SWIPE_RIGHT) and self.next_suggestion_callback:
+                if now - self.last_suggestion_time < self.save_debounce_period:
+                    return
+                self.last_suggestion_time = now
+                self.next_suggestion_callback()
+            elif gesture == OPEN_PALM and self.stop_callback:
+                self.stop_callback()
+        except Exception as e:
+            print(f"Gesture action for '{gesture}' failed: {e}")
+
+    def _held_item(self, frame_rgb):
+        """
+        Wardrobe item for the garment held below the hand that gave the thumbs-up (None if off-frame).
+        Its 'bbox' is in display pixels (the full-resolution frame), like the boxes the rest of
+        the wardrobe uses, not in the downscaled inference frame the color is sampled from.
+        """
+        height, width = frame_rgb.shape[:2]
+        points = self.gestures.latest_points()
+        bbox = held_item_bbox(points, width, height) if points is not None else None
+        if bbox is None:
+            return None
+        # extract_color expects BGR; the reversed view only copies the few sampled pixels
+        color = extract_color(frame_rgb[..., ::-1], bbox)
+        display_width, display_height = self._display_size or (width, height)
+        scale_x, scale_y = display_width / width, display_height / height
+        display_bbox = [round(bbox[0] * scale_x), round(bbox[1] * scale_y),
+                        round(bbox[2] * scale_x), round(bbox[3] * scale_y)]
+        # No garment detector here: the label is guessed from how high the item is held, so it lands
+        # in a category ('tops' / 'bottoms') the outfit engine can combine
+        return {'label': held_item_label(points), 'label_source': 'hand_height', 'color': color,
+                'bbox': display_bbox, 'source': 'gesture'}
+
+    @staticmethod
+    def _draw(frame, multi_hand_landmarks):
+        """Draws hand landmarks onto the frame in place."""
+        for hand_landmarks in multi_hand_landmarks or ():
+            mp_drawing.draw_landmarks(
+                frame,
+                hand_landmarks,
+                mp_hands.HAND_CONNECTIONS,
+                LANDMARK_STYLE,
+                CONNECTION_STYLE
+            )
+
+    def annotate(self, frame):
+        """Draws the most recent landmarks onto a BGR display frame in place and returns it."""
+        with perf_metrics.stage('vision.draw_landmarks'):
+            self._draw(frame, self._latest_landmarks)
+        return frame
+
     def process_frame(self, frame):
         """Processes a single BGR frame from the webcam using MediaPipe."""
-        
-        # Convert the BGR frame to RGB for MediaPipe processing
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Process the frame
-        results = self.hands.process(frame_rgb)
+        self._ensure_buffers(frame)
+        self._display_size = (frame.shape[1], frame.shape[0])
+        # Convert the BGR frame to RGB (at inference resolution) for MediaPipe processing
+        multi_hand_landmarks = self._infer(self._to_inference_rgb(frame, self._sync_rgb))
         annotated_frame = frame
-        current_status = "No activity."
-
-        if results.multi_hand_landmarks:
-            current_status = "Hand detected."
-            
-            # Draw hand landmarks onto the frame
-            for hand_landmarks in results.multi_hand_landmarks:
-                mp_drawing.draw_landmarks(
-                    annotated_frame,
-                    hand_landmarks,
-                    mp_hands.HAND_CONNECTIONS,
-                    mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                    mp_drawing.DrawingSpec(color=(0, 0, 255), thickness=2)
-                )
+        with perf_metrics.stage('vision.draw_landmarks'):
+            self._draw(annotated_frame, multi_hand_landmarks)
 
-        # Update the latest live status for the AI Stylist
-        self.latest_live_status = current_status
-            
         # NOTE: Since MediaPipe is lighter than YOLO, we can keep the frame rate higher.
-        
+
         return annotated_frame
 
+    def next_frame_due(self):
+        """Advances the frame counter; True if this frame should go to the worker for full inference."""
+        if self._worker is None:
+            self.start_worker()
+        self._frame_index += 1
+        return self._frame_index % self.infer_every == 0
+
+    def submit_rgb(self, frame_rgb):
+        """Hands an RGB frame already at inference resolution to the worker (the worker takes ownership)."""
+        self._offer(frame_rgb)
+
+    def process_video_frame(self, frame):
+        """
+        Latest-frame mode for PyAV frames (the WebRTC path). The worker gets a small rgb24 copy
+        straight from PyAV's scaler, so there is no full-size BGR->RGB conversion, and frames
+        with nothing to draw are passed through without being converted at all.
+        """
+        perf_metrics.tick('vision.recv_fps')
+        with perf_metrics.stage('vision.recv'):
+            if self.next_frame_due():
+                self._display_size = (frame.width, frame.height)
+                width, height = self.inference_size(frame.width, frame.height)
+                with perf_metrics.stage('vision.reformat_rgb'):
+                    small = frame.reformat(width=width, height=height, format="rgb24", interpolation="FAST_BILINEAR")
+                    small = small.to_ndarray()
+                self.submit_rgb(small)
+
+            if not self._latest_landmarks:
+                return frame
+
+            with perf_metrics.stage('vision.to_ndarray'):
+                img = frame.to_ndarray(format="bgr24")
+            self.annotate(img)
+            with perf_metrics.stage('vision.from_ndarray'):
+                return type(frame).from_ndarray(img, format="bgr24")
+
+    def _offer(self, frame_rgb):
+        """Puts a frame in the single-slot mailbox, replacing (dropping) any frame still waiting."""
+        with self._slot:
+            if self._pending is not None:
+                self.dropped_frames += 1
+                perf_metrics.count('vision.dropped_frames')
+            self._pending = frame_rgb
+            self._slot.notify()
+
+    def start_worker(self):
+        """Starts the background inference thread (idempotent)."""
+        with self._slot:
+            if self._worker is not None:
+                return
+            self._stopping = False
+            self._worker = threading.Thread(target=self._worker_loop, name="mira-vision-worker", daemon=True)
+            self._worker.start()
+
+    def release_hands(self):
+        """Gives this session's pinned graph back to the pool (e.g. when the session ends)."""
+        if self.hands_pool is not None:
+            self.hands_pool.release(self._hands_owner)
+
+    def stop(self):
+        """Stops the worker and unpins the hands graph (stream stopped or session over). Idempotent."""
+        self.stop_worker()
+        self.release_hands()
+
+    def stop_worker(self):
+        """Stops the background inference thread and waits for it to exit."""
+        with self._slot:
+            worker, self._worker = self._worker, None
+            self._stopping = True
+            self._slot.notify()
+        if worker is not None:
+            worker.join(timeout=2)
+
+    def _worker_loop(self):
+        while True:
+            with self._slot:
+                while self._pending is None and not self._stopping:
+                    if not self._slot.wait(timeout=WORKER_IDLE_SECONDS) and self._pending is None:
+                        # No frames for a while: nobody is watching, so stop holding a graph
+                        if self._worker is threading.current_thread():
+                            self._worker = None
+                        self.release_hands()
+                        return
+                if self._stopping:
+                    return
+                frame_rgb, self._pending = self._pending, None
+
+            start = time.perf_counter()
+            try:
+                self._latest_landmarks = self._infer(frame_rgb)
+            except Exception as e:
+                print(f"Vision worker error: {e}")
+                continue
+            self._adapt_cadence(time.perf_counter() - start)
+            perf_metrics.tick('vision.inference_fps')
+
+    def _adapt_cadence(self, inference_time):
+        """Chooses N so that inference averaged over N frames stays within the latency budget."""
+        if self.avg_inference_time == 0.0:
+            self.avg_inference_time = inference_time
+        else:
+            self.avg_inference_time = 0.8 * self.avg_inference_time + 0.2 * inference_time
+        needed = math.ceil(self.avg_inference_time / self.latency_budget) if self.latency_budget > 0 else 1
+        self.infer_every = max(1, min(self.max_frame_skip, needed))
+
     # FIX C: Method required by AIStylistModule
     def get_live_detections(self):
         """
@@ -75,4 +340,4 @@ class VisionProcessor:
         return self.latest_live_status
 
     # NOTE: _process_yolo_results is removed as YOLO is gone.
-    # We will rely on the AI stylist to understand the 'No activity' vs 'Hand detected' status.
\ No newline at end of file
+    # We will rely on the AI stylist to understand the 'No activity' vs 'Hand detected' status.
@@ -1,22 +1,54 @@
 # voice_module.py (FINAL NON-BLOCKING VERSION)
 import speech_recognition as sr
-from elevenlabs.client import ElevenLabs
 from elevenlabs import Voice 
 import os
+import queue
+import threading
+import time
 from io import BytesIO 
 import sounddevice as sd
 import numpy as np
-from pydub import AudioSegment# <-- REQUIRES FFMPEG to decode the stream
+import perf_metrics
+from audio_stream import StreamingAudioPlayer
+from resource_registry import get_elevenlabs_client
+from stream_copy import StreamCopy
+from tts_cache import get_tts_cache
 
 # --- Configuration ---
 ELEVEN_API_KEY = os.getenv('ELEVEN_API_KEY')
 ELEVEN_VOICE_ID = "cgSgspJ2msm6clMCkdW9" 
+ELEVEN_MODEL_ID = "eleven_multilingual_v2"
+# Streaming playback asks ElevenLabs for raw 16-bit PCM, so no ffmpeg decode is needed.
+# Set MIRA_TTS_STREAMING=0 to fall back to the MP3 + pydub path.
+TTS_STREAMING = os.getenv('MIRA_TTS_STREAMING', '1') == '1'
+TTS_PCM_FORMAT = "pcm_22050"
+TTS_SAMPLE_RATE = 22050
+
+def prewarm_tts_cache(phrases, client, tts_cache=None):
+    """
+    Synthesizes any of 'phrases' not in the TTS cache yet (no playback). Needs no VoiceModule,
+    so resource_registry can run it once per process while the voice subsystem loads.
+    """
+    if not client:
+        return
+    tts_cache = tts_cache or get_tts_cache()
+    for text in phrases:
+        key = tts_cache.make_key(text, ELEVEN_VOICE_ID, ELEVEN_MODEL_ID, TTS_PCM_FORMAT)
+        if key in tts_cache:
+            continue
+        try:
+            tts_cache.put(key, b"".join(client.text_to_speech.stream(
+                voice_id=ELEVEN_VOICE_ID, text=text, model_id=ELEVEN_MODEL_ID, output_format=TTS_PCM_FORMAT
+            )))
+        except Exception as e:
+            print(f"TTS pre-warm failed for '{text[:30]}...': {e}")
 
 class VoiceModule:
     def __init__(self, eleven_api_key=ELEVEN_API_KEY):
         print("Initializing Voice Module...")
         if eleven_api_key:
-            self.elevenlabs_client = ElevenLabs(api_key=eleven_api_key)
+            # Shared across sessions (see resource_registry.py)
+            self.elevenlabs_client = get_elevenlabs_client(eleven_api_key)
             print("ElevenLabs Client initialized.")
         else:
             self.elevenlabs_client = None
@@ -24,6 +56,18 @@ class VoiceModule:
             
         self.recognizer = sr.Recognizer()
         self.microphone = sr.Microphone()
+        self.listener = None  # ContinuousListener while continuous listening is on
+
+        # --- Sentence-by-sentence speech pipeline (see enqueue_speech) ---
+        # One thread streams each sentence's PCM into a shared ring buffer that a single
+        # output stream plays from, so sentence N+1 is fetched while sentence N is playing.
+        self.player = StreamingAudioPlayer(TTS_SAMPLE_RATE)
+        # Decoded PCM for phrases spoken before (shared on disk by every session)
+        self.tts_cache = get_tts_cache()
+        self._text_queue = queue.Queue()
+        self._speech_generation = 0   # bumped by cancel_speech; stale items are skipped
+        self._speech_thread = None
+        self._speech_lock = threading.Lock()
         print("Voice Module Ready.")
 
     def listen_for_command(self):
@@ -48,44 +92,192 @@ class VoiceModule:
             print(f"Speech recognition service error; {e}")
             return "ERROR"
 
-    def speak_response(self, text):
-        """Generates audio and plays it back using pydub (FFMPEG) and sounddevice (non-blocking)."""
-        if not self.elevenlabs_client:
-            print(f"(TTS Disabled) MiraAI would say: {text}")
+    def start_continuous_listening(self, on_command, backend=None):
+        """
+        Listens in the background until stopped: the microphone is calibrated once, an energy
+        gate cuts utterances, and a worker pool transcribes them. on_command(text) is called
+        from a worker thread for every recognized phrase.
+        """
+        from speech_listener import SPEECH_BACKEND, ContinuousListener, MicrophoneSource
+
+        if self.listener is not None:
             return
-            
-        print(f"MiraAI response: {text}")
+        self.listener = ContinuousListener(
+            MicrophoneSource(), on_command=on_command, backend=backend or SPEECH_BACKEND, recognizer=self.recognizer,
+            is_muted=lambda: self.player.active  # never transcribe Mira's own voice
+        )
+        self.listener.start()
+        print("Continuous listening started.")
+
+    def stop_continuous_listening(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            print("Continuous listening stopped.")
+
+    def _synthesize(self, text):
+        """MP3 fallback path: generates the whole clip. Returns (int16 samples, sample rate) or None."""
         try:
-            # 1. Generate the audio (returns generator)
-            audio_generator = self.elevenlabs_client.text_to_speech.convert(
-                text=text,
-                voice_id=ELEVEN_VOICE_ID,
-                model_id="eleven_multilingual_v2", 
-                output_format="mp3_44100" 
-            )
-            
-            # 2. Collect the audio chunks from the generator into one bytes object
-            audio_bytes = b"".join(audio_generator)
-            
-            # 3. Use pydub to load and process the audio bytes (Requires FFMPEG installed and in PATH)
-            audio_segment = AudioSegment.from_file(BytesIO(audio_bytes), format="mp3")
-            
-            # 4. Extract parameters and convert to numpy array
-            audio_segment = audio_segment.set_sample_width(2) 
-            audio_np = np.array(audio_segment.get_array_of_samples(), dtype=np.int16)
-            
-            # 5. Play the audio using sounddevice
-            # sd.play() is non-blocking by default (blocking=False), and since we call
-            # this from a background thread in mira_app.py, the main thread stays free.
-            sd.play(audio_np, samplerate=audio_segment.frame_rate)
+            from pydub import AudioSegment # <-- REQUIRES FFMPEG to decode the stream
+
+            with perf_metrics.stage('tts.synthesize'):
+                # 1. Generate the audio (returns generator)
+                audio_generator = self.elevenlabs_client.text_to_speech.convert(
+                    text=text,
+                    voice_id=ELEVEN_VOICE_ID,
+                    model_id=ELEVEN_MODEL_ID, 
+                    output_format="mp3_44100" 
+                )
+                
+                # 2. Collect the audio chunks from the generator into one bytes object
+                audio_bytes = b"".join(audio_generator)
             
-            # CRITICAL FIX: REMOVE THE BLOCKING CALL
-            # sd.wait() would block the thread until playback finishes, which is what caused the UI freeze.
-            # We rely on the threading.Thread in mira_app.py to handle the background execution.
+            with perf_metrics.stage('tts.decode'):
+                # 3. Use pydub to load and process the audio bytes (Requires FFMPEG installed and in PATH)
+                audio_segment = AudioSegment.from_file(BytesIO(audio_bytes), format="mp3")
+                
+                # 4. Extract parameters and convert to numpy array
+                audio_segment = audio_segment.set_sample_width(2) 
+                audio_np = np.array(audio_segment.get_array_of_samples(), dtype=np.int16)
+            return audio_np, audio_segment.frame_rate
 
         except Exception as e:
             print(f"ElevenLabs or Audio Playback error: {e}")
             # NOTE: The FileNotFoundError for 'ffmpeg' is common if FFMPEG is not in PATH.
             if "ffmpeg" in str(e).lower():
                  print("CRITICAL: FFMPEG NOT FOUND. Ensure FFMPEG is installed and in your system PATH.")
-            return
\ No newline at end of file
+            return None
+
+    def _stream_pcm(self, text):
+        """Yields raw PCM chunks for 'text' as ElevenLabs produces them."""
+        return self.elevenlabs_client.text_to_speech.stream(
+            voice_id=ELEVEN_VOICE_ID,
+            text=text,
+            model_id=ELEVEN_MODEL_ID,
+            output_format=TTS_PCM_FORMAT
+        )
+
+    def _cache_key(self, text):
+        return self.tts_cache.make_key(text, ELEVEN_VOICE_ID, ELEVEN_MODEL_ID, TTS_PCM_FORMAT)
+
+    def prewarm(self, phrases):
+        """Synthesizes any of 'phrases' not cached yet (no playback), so they play instantly later."""
+        prewarm_tts_cache(phrases, self.elevenlabs_client, self.tts_cache)
+
+    def speak_response(self, text):
+        """
+        Speaks 'text' without blocking the caller. A new response preempts whatever is
+        still playing. With streaming enabled, playback starts after the first audio chunk.
+        """
+        if not self.elevenlabs_client:
+            print(f"(TTS Disabled) MiraAI would say: {text}")
+            return
+
+        if TTS_STREAMING:
+            self.cancel_speech()
+            self.enqueue_speech(text)
+            return
+            
+        print(f"MiraAI response: {text}")
+        audio = self._synthesize(text)
+        if audio is None:
+            return
+
+        # 5. Play the audio using sounddevice
+        # sd.play() is non-blocking by default (blocking=False), and since we call
+        # this from a background thread in mira_app.py, the main thread stays free.
+        sd.play(audio[0], samplerate=audio[1])
+        
+        # CRITICAL FIX: REMOVE THE BLOCKING CALL
+        # sd.wait() would block the thread until playback finishes, which is what caused the UI freeze.
+        # We rely on the threading.Thread in mira_app.py to handle the background execution.
+
+    def enqueue_speech(self, text, cancel_token=None):
+        """
+        Queues one sentence for the speech pipeline and returns immediately.
+        Sentences are played back in order, each one streamed while the previous one plays.
+        Nothing is queued once 'cancel_token' (the job producing the sentences) is cancelled.
+        """
+        if cancel_token is not None and cancel_token.cancelled:
+            return
+        if not self.elevenlabs_client:
+            print(f"(TTS Disabled) MiraAI would say: {text}")
+            return
+        self._start_speech_pipeline()
+        # Generation and ring epoch are read together, so a cancel_speech cannot fall in between
+        with self._speech_lock:
+            self._text_queue.put((self._speech_generation, self.player.ring.epoch, text))
+
+    def cancel_speech(self):
+        """Drops every queued sentence and stops the one currently playing."""
+        with self._speech_lock:
+            self._speech_generation += 1
+            self.player.ring.cancel()
+        try:
+            while True:
+                self._text_queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.player.close()
+        if not TTS_STREAMING:
+            sd.stop()
+
+    def _start_speech_pipeline(self):
+        with self._speech_lock:
+            if self._speech_thread is None:
+                self._speech_thread = threading.Thread(target=self._speech_loop, name="mira-tts", daemon=True)
+                self._speech_thread.start()
+
+    def _speech_loop(self):
+        while True:
+            generation, epoch, text = self._text_queue.get()
+            with self._speech_lock:
+                stale = generation != self._speech_generation or epoch != self.player.ring.epoch
+            if stale:
+                continue
+            print(f"MiraAI response: {text}")
+            try:
+                # Played with the epoch it was queued under: a cancel after this point makes its
+                # ring writes fail instead of letting it play over the next answer
+                self._speak_sentence(text, epoch)
+            except Exception as e:
+                print(f"ElevenLabs or Audio Playback error: {e}")
+
+    def _speak_sentence(self, text, epoch):
+        """Plays one sentence; returns once its audio is queued (or, if nothing follows, played out)."""
+        if TTS_STREAMING:
+            key = self._cache_key(text)
+            cached = self.tts_cache.get(key)
+            if cached is not None:
+                # Cache hit: no ElevenLabs call, no decode, playback starts immediately.
+                perf_metrics.count('tts.cache_hits')
+                if not self.player.feed([cached], epoch):
+                    return
+            else:
+                start = time.perf_counter()
+                chunks = self._stream_pcm(text)
+                # Keeps a copy for the cache, dropped once the clip is too big to be cached anyway
+                copy = StreamCopy(limit=self.tts_cache.max_item_bytes)
+                try:
+                    if not self.player.feed(copy.tee(chunks), epoch):
+                        return  # preempted by cancel_speech
+                finally:
+                    # Closing the generator releases the HTTP response early when cancelled.
+                    getattr(chunks, 'close', lambda: None)()
+                    if copy.first_chunk_at is not None:
+                        perf_metrics.record('tts.first_chunk', copy.first_chunk_at - start)
+                pcm = copy.joined()
+                if pcm is None:
+                    perf_metrics.count('tts.uncached_long_clips')
+                else:
+                    self.tts_cache.put(key, pcm)
+            if self._text_queue.empty():
+                self.player.drain(epoch)
+            return
+
+        audio = self._synthesize(text)
+        if audio is not None:
+            # Blocking here is fine: this is the dedicated speech thread, and waiting
+            # keeps consecutive sentences from cutting each other off.
+            sd.play(audio[0], samplerate=audio[1])
+            sd.wait()
@@ -1,53 +1,318 @@
 # wardrobe_db.py
+import argparse
+import hashlib
 import json
+import os
+import threading
 from datetime import datetime
 
-# Path to the persistent storage file
+import perf_metrics
+
+from wardrobe_dedup import (
+    DEDUP_IOU_THRESHOLD, DEDUP_WINDOW_SECONDS, DetectionDeduplicator, compact_items, merge_detection,
+)
+from wardrobe_storage import JsonFileBackend, create_backend, migrate_json_to_sqlite
+
+# Path to the legacy JSON storage file (still used by the 'json' backend and as the migration source)
 WARDROBE_FILE = 'mira_wardrobe.json'
+# Path to the SQLite store used by the default backend
+WARDROBE_DB_FILE = 'mira_wardrobe.db'
+# Storage engine: 'sqlite' (default, constant-time appends) or 'json' (original whole-file rewrite)
+WARDROBE_BACKEND = os.getenv('MIRA_WARDROBE_BACKEND', 'sqlite')
+
+_backend = None
+_backend_lock = threading.Lock()
+
+# Add-time de-duplication of repeated detections (see wardrobe_dedup.py)
+_deduplicator = DetectionDeduplicator()
+_dedup_lock = threading.Lock()
+
+# Rough garment categories used for the summary aggregates
+LABEL_CATEGORIES = {
+    'tops': ('t-shirt', 'shirt', 'top', 'blouse', 'sweater', 'hoodie', 'polo', 'tank top', 'cardigan'),
+    'bottoms': ('pants', 'jeans', 'trousers', 'shorts', 'skirt', 'leggings'),
+    'outerwear': ('jacket', 'coat', 'blazer', 'vest', 'parka'),
+    'dresses': ('dress', 'jumpsuit', 'suit'),
+    'footwear': ('shoes', 'sneakers', 'boots', 'heels', 'sandals', 'flats', 'loafers'),
+    'accessories': ('hat', 'cap', 'scarf', 'tie', 'handbag', 'backpack', 'belt', 'watch',
+                    'sunglasses', 'necklace', 'bracelet', 'earrings', 'umbrella', 'suitcase'),
+}
+_CATEGORY_BY_LABEL = {label: category for category, labels in LABEL_CATEGORIES.items() for label in labels}
+
+
+def categorize_label(label):
+    """Maps a detection label to a garment category ('other' for non-clothing such as 'person' or 'tv')."""
+    return _CATEGORY_BY_LABEL.get((label or '').lower(), 'other')
+
+
+class WardrobeCache:
+    """
+    Process-wide view of the wardrobe aggregates (per-label, per-color and per-category counts).
+    Adds made through this module update the counts in place; writes from other processes
+    are picked up by comparing the backend's file fingerprint on each read.
+    Every change bumps a monotonically increasing version number.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = 0
+        self._fingerprint = None
+        self._loaded = False
+        self._summary = None
+        self._content_hash = None
+        self.label_counts = {}
+        self.color_counts = {}
+        self.category_counts = {}
+        self.item_counts = {}  # (label, color) -> count
+
+    def _count(self, label, color):
+        label = label or 'unknown item'
+        color = color or 'unknown'
+        self.label_counts[label] = self.label_counts.get(label, 0) + 1
+        self.color_counts[color] = self.color_counts.get(color, 0) + 1
+        category = categorize_label(label)
+        self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        self.item_counts[(label, color)] = self.item_counts.get((label, color), 0) + 1
+
+    def _reload(self, backend):
+        self._fingerprint = backend.fingerprint()
+        self.label_counts, self.color_counts, self.category_counts, self.item_counts = {}, {}, {}, {}
+        for label, color in backend.label_color_pairs():
+            self._count(label, color)
+        self._loaded = True
+        self._summary = None
+        self._content_hash = None
+        self.version += 1
+
+    def refresh(self, backend):
+        """Reloads the aggregates if this is the first access or the files changed underneath us."""
+        with self._lock:
+            if not self._loaded or backend.fingerprint() != self._fingerprint:
+                self._reload(backend)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    def record_add(self, backend, item):
+        """Persists 'item' through the backend and folds it into the counts without a reload."""
+        with self._lock:
+            # The fingerprints around the append are read under the backend's write lock, so a
+            # write from another process can only show up as 'before' differing from ours
+            item_id, before, after = backend.tracked('append', item)
+            if not self._loaded or before != self._fingerprint:
+                self._reload(backend)
+            else:
+                self._count(item.get('label'), item.get('color'))
+                self._fingerprint = after
+                self._summary = None
+                self._content_hash = None
+                self.version += 1
+            return item_id
+
+    def current_version(self, backend):
+        with self._lock:
+            self.refresh(backend)
+            return self.version
+
+    def record_update(self, backend, item_id, item):
+        """
+        Persists a merged item. The counts (and so the summary and content hash) are unchanged,
+        but the item itself is not, so the version still moves on.
+        """
+        with self._lock:
+            _, before, after = backend.tracked('update', item_id, item)
+            if not self._loaded or before != self._fingerprint:
+                self._reload(backend)
+            else:
+                self._fingerprint = after
+                self.version += 1
+
+    def snapshot(self, backend):
+        with self._lock:
+            self.refresh(backend)
+            return {
+                'version': self.version,
+                'labels': dict(self.label_counts),
+                'colors': dict(self.color_counts),
+                'categories': dict(self.category_counts),
+            }
+
+    def item_classes(self, backend):
+        """Returns (version, [(label, color, count), ...]): the wardrobe grouped by identical label and color."""
+        with self._lock:
+            self.refresh(backend)
+            return self.version, [(label, color, count) for (label, color), count in self.item_counts.items()]
+
+    def summary(self, backend):
+        with self._lock:
+            self.refresh(backend)
+            if self._summary is None:
+                self._summary = self._format_summary()
+            return self._summary
+
+    def content_hash(self, backend):
+        """Hash of the label and color counts: equal for equal wardrobe contents, across processes too."""
+        with self._lock:
+            self.refresh(backend)
+            if self._content_hash is None:
+                payload = json.dumps([sorted(self.label_counts.items()), sorted(self.color_counts.items())])
+                self._content_hash = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+            return self._content_hash
+
+    def _format_summary(self):
+        if not self.label_counts:
+            return "The virtual wardrobe is currently empty."
+
+        summary = "Current virtual wardrobe items:\n"
+        for label, count in self.label_counts.items():
+            summary += f"- {count} x {label}\n"
+
+        return summary.strip()
+
+
+_cache = WardrobeCache()
+
+
+def get_backend():
+    """Returns the process-wide storage backend, creating (and migrating into) it on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if WARDROBE_BACKEND == 'sqlite':
+                    # One-shot import of the old JSON file; a no-op once it has run.
+                    migrate_json_to_sqlite(WARDROBE_FILE, WARDROBE_DB_FILE)
+                    _backend = create_backend('sqlite', WARDROBE_DB_FILE)
+                else:
+                    _backend = create_backend(WARDROBE_BACKEND, WARDROBE_FILE)
+    return _backend
+
+
+def set_backend(backend):
+    """Swaps the storage backend (e.g. a temporary store for benchmarks). Returns the previous one."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    _cache.invalidate()
+    with _dedup_lock:
+        _deduplicator.clear()
+    return previous
+
 
 def load_wardrobe():
-    """Loads the entire virtual wardrobe from the JSON file."""
-    try:
-        with open(WARDROBE_FILE, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Wardrobe file not found: {WARDROBE_FILE}. Starting fresh.")
-        return []
-    except json.JSONDecodeError:
-        print("Wardrobe file is corrupted. Starting fresh.")
-        return []
+    """Loads the entire virtual wardrobe from storage."""
+    with perf_metrics.stage('wardrobe.load'):
+        return get_backend().load_all()
 
 def save_wardrobe(wardrobe_list):
-    """Saves the current state of the virtual wardrobe to the JSON file."""
-    with open(WARDROBE_FILE, 'w') as f:
-        json.dump(wardrobe_list, f, indent=4)
+    """Atomically replaces the stored virtual wardrobe with 'wardrobe_list'."""
+    with perf_metrics.stage('wardrobe.save'):
+        get_backend().replace_all(wardrobe_list)
+    _cache.invalidate()
+    with _dedup_lock:
+        _deduplicator.clear()
     print(f"Wardrobe saved with {len(wardrobe_list)} items.")
 
 def add_item_to_wardrobe(item_data):
     """
     Adds a new item to the wardrobe.
     item_data should be a dict: {'label': 't-shirt', 'confidence': 0.95, 'color': 'red', ...}
+    Returns True if it was merged into an item seen moments ago instead of stored as a new one.
     """
-    wardrobe = load_wardrobe()
     # Add a timestamp for easy tracking/management
-    item_data['added_on'] = datetime.now().isoformat()
-    wardrobe.append(item_data)
-    save_wardrobe(wardrobe)
-    
+    now = datetime.now()
+    item_data['added_on'] = now.isoformat()
+    item_data.setdefault('seen_count', 1)
+    item_data['last_seen'] = item_data['added_on']
+
+    backend = get_backend()
+    with _dedup_lock, perf_metrics.stage('wardrobe.add'):
+        # The same garment seen again a few seconds later is merged, not stored twice.
+        match = _deduplicator.match(item_data, now.timestamp())
+        if match is not None:
+            item_id, existing = match
+            merge_detection(existing, item_data)
+            _cache.record_update(backend, item_id, existing)
+            perf_metrics.count('wardrobe.merged_detections')
+            print(f"Wardrobe item seen again: {item_data.get('label', 'unknown item')} "
+                  f"(merged, seen {existing.get('seen_count', 1)} times).")
+            return True
+        item_id = _cache.record_add(backend, item_data)
+        _deduplicator.remember(item_id, item_data, now.timestamp())
+    print(f"Wardrobe item added: {item_data.get('label', 'unknown item')}.")
+    return False
+
 def get_wardrobe_summary():
     """Returns a simple text summary of the current wardrobe for the AI."""
-    wardrobe = load_wardrobe()
-    if not wardrobe:
-        return "The virtual wardrobe is currently empty."
-        
-    summary = "Current virtual wardrobe items:\n"
-    # Group items by label for a cleaner summary
-    item_counts = {}
-    for item in wardrobe:
-        label = item.get('label', 'unknown item')
-        item_counts[label] = item_counts.get(label, 0) + 1
-        
-    for label, count in item_counts.items():
-        summary += f"- {count} x {label}\n"
-        
-    return summary.strip()
\ No newline at end of file
+    # Served from the in-process aggregates: O(labels), no disk read unless the files changed.
+    with perf_metrics.stage('wardrobe.summary'):
+        return _cache.summary(get_backend())
+
+def get_wardrobe_counts():
+    """Returns the per-label, per-color and per-category counts plus the version they belong to."""
+    return _cache.snapshot(get_backend())
+
+def get_wardrobe_item_classes():
+    """Returns (version, [(label, color, count), ...]) with one entry per distinct label/color pair."""
+    return _cache.item_classes(get_backend())
+
+def get_wardrobe_version():
+    """Returns the current wardrobe version; it increases every time the contents change."""
+    return _cache.current_version(get_backend())
+
+def get_wardrobe_hash():
+    """Returns a content hash of the wardrobe aggregates (unlike the version, stable across restarts)."""
+    return _cache.content_hash(get_backend())
+
+def wardrobe_changed_since(version):
+    """True if the wardrobe changed after 'version' (as returned by get_wardrobe_version)."""
+    return get_wardrobe_version() != version
+
+
+def compact_wardrobe(path=None, iou_threshold=DEDUP_IOU_THRESHOLD, window_seconds=DEDUP_WINDOW_SECONDS,
+                     dry_run=False):
+    """
+    Rewrites an existing wardrobe with repeated detections merged.
+    'path' points at a JSON wardrobe file; without it the configured store is compacted.
+    Returns (items_before, items_after).
+    """
+    backend = JsonFileBackend(path) if path else get_backend()
+    items = backend.load_all()
+    compacted = compact_items(items, iou_threshold, window_seconds)
+    if not dry_run:
+        backend.replace_all(compacted)
+        if backend is _backend:
+            _cache.invalidate()
+            with _dedup_lock:
+                _deduplicator.clear()
+    return len(items), len(compacted)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MiraAI wardrobe maintenance commands.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help="Import a legacy JSON wardrobe into the SQLite store.")
+    migrate.add_argument('--json', default=WARDROBE_FILE, help="Source JSON file.")
+    migrate.add_argument('--db', default=WARDROBE_DB_FILE, help="Target SQLite database.")
+    migrate.add_argument('--force', action='store_true', help="Re-import, replacing the database contents.")
+
+    compact = subparsers.add_parser('compact', help="Merge repeated detections of the same garment.")
+    compact.add_argument('--file', help="JSON wardrobe file to rewrite (default: the configured store).")
+    compact.add_argument('--iou', type=float, default=DEDUP_IOU_THRESHOLD, help="Minimum bbox IoU to merge.")
+    compact.add_argument('--window', type=float, default=DEDUP_WINDOW_SECONDS,
+                         help="Maximum gap in seconds between merged sightings.")
+    compact.add_argument('--dry-run', action='store_true', help="Report the result without writing.")
+
+    args = parser.parse_args(argv)
+    if args.command == 'migrate':
+        migrate_json_to_sqlite(args.json, args.db, force=args.force)
+    elif args.command == 'compact':
+        before, after = compact_wardrobe(args.file, args.iou, args.window, dry_run=args.dry_run)
+        action = "Would compact" if args.dry_run else "Compacted"
+        print(f"{action} wardrobe from {before} to {after} items.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# wardrobe_dedup.py (Merges repeated detections of the same garment)
+from datetime import datetime
+
+# Two boxes with at least this much overlap are treated as the same garment
+DEDUP_IOU_THRESHOLD = 0.5
+# ...as long as the earlier one was last seen within this many seconds
+DEDUP_WINDOW_SECONDS = 30.0
+
+
+def bbox_iou(box_a, box_b):
+    """Intersection-over-union of two [x1, y1, x2, y2] boxes (0.0 if either is missing)."""
+    if not box_a or not box_b or len(box_a) != 4 or len(box_b) != 4:
+        return 0.0
+    ax1, ay1, ax2, ay2 = box_a
+    bx1, by1, bx2, by2 = box_b
+    inter_w = min(ax2, bx2) - max(ax1, bx1)
+    inter_h = min(ay2, by2) - max(ay1, by1)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    intersection = inter_w * inter_h
+    union = (ax2 - ax1) * (ay2 - ay1) + (bx2 - bx1) * (by2 - by1) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def _timestamp(value):
+    """Parses an ISO timestamp into epoch seconds (None if missing or malformed)."""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def merge_detection(existing, new_item):
+    """Folds 'new_item' into 'existing' in place: bumps seen_count and last_seen, keeps the newest bbox."""
+    existing['seen_count'] = existing.get('seen_count', 1) + new_item.get('seen_count', 1)
+    existing['last_seen'] = new_item.get('last_seen') or new_item.get('added_on') or existing.get('last_seen')
+    if new_item.get('bbox'):
+        # Track the garment where it is now, so the next frame is compared to its current position.
+        existing['bbox'] = new_item['bbox']
+    if new_item.get('confidence', 0) > existing.get('confidence', 0):
+        existing['confidence'] = new_item['confidence']
+    return existing
+
+
+class DetectionDeduplicator:
+    """
+    Sliding-window matcher: a detection with the same label and color as a recently seen
+    item, and a bbox IoU above the threshold, is the same garment and gets merged.
+    Only items seen within the window are kept in memory, so matching stays cheap.
+    """
+
+    def __init__(self, iou_threshold=DEDUP_IOU_THRESHOLD, window_seconds=DEDUP_WINDOW_SECONDS):
+        self.iou_threshold = iou_threshold
+        self.window_seconds = window_seconds
+        # (label, color) -> list of [last_seen_ts, item_id, item]
+        self._recent = {}
+
+    def _prune(self, key, now):
+        entries = [entry for entry in self._recent.get(key, ()) if now - entry[0] <= self.window_seconds]
+        if entries:
+            self._recent[key] = entries
+        else:
+            self._recent.pop(key, None)
+        return entries
+
+    def match(self, item, now):
+        """Returns (item_id, stored_item) of the best recent match for 'item', or None."""
+        key = (item.get('label'), item.get('color'))
+        best, best_iou = None, self.iou_threshold
+        for entry in self._prune(key, now):
+            iou = bbox_iou(entry[2].get('bbox'), item.get('bbox'))
+            if iou >= best_iou:
+                best, best_iou = entry, iou
+        if best is None:
+            return None
+        best[0] = now
+        return best[1], best[2]
+
+    def remember(self, item_id, item, now):
+        key = (item.get('label'), item.get('color'))
+        self._prune(key, now)
+        self._recent.setdefault(key, []).append([now, item_id, item])
+
+    def clear(self):
+        self._recent.clear()
+
+
+def compact_items(items, iou_threshold=DEDUP_IOU_THRESHOLD, window_seconds=DEDUP_WINDOW_SECONDS):
+    """
+    Offline version of the add-time de-duplication: replays 'items' in time order
+    and returns the merged list (one entry per distinct garment sighting).
+    """
+    deduplicator = DetectionDeduplicator(iou_threshold, window_seconds)
+    compacted = []
+    timed = [(_timestamp(item.get('added_on')), index, item) for index, item in enumerate(items)]
+    # Undated items keep their original relative order at the front.
+    timed.sort(key=lambda entry: (entry[0] is not None, entry[0] or 0.0, entry[1]))
+    for ts, _, item in timed:
+        item = dict(item)
+        item.setdefault('seen_count', 1)
+        item.setdefault('last_seen', item.get('added_on'))
+        if ts is None:
+            compacted.append(item)
+            continue
+        # Compare against when the new item was last seen, not when it was first added.
+        seen_ts = _timestamp(item.get('last_seen')) or ts
+        match = deduplicator.match(item, seen_ts)
+        if match is not None:
+            merge_detection(match[1], item)
+        else:
+            deduplicator.remember(len(compacted), item, seen_ts)
+            compacted.append(item)
+    return compacted
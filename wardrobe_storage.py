@@ -0,0 +1,378 @@
+# wardrobe_storage.py (Pluggable storage engines behind wardrobe_db)
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl  # POSIX advisory locks for cross-process safety
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+
+@contextmanager
+def _file_lock(path):
+    """Holds an exclusive advisory lock on '<path>.lock' (no-op where fcntl is unavailable)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _atomic_write_json(path, data):
+    """Writes JSON to a temp file in the same directory, then renames it over 'path'."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.wardrobe-', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class WardrobeBackend:
+    """Interface every wardrobe storage engine implements."""
+
+    name = 'base'
+
+    def __init__(self, path):
+        self.path = path
+
+    def load_all(self):
+        """Returns every stored item as a list of dicts, oldest first."""
+        raise NotImplementedError
+
+    def append(self, item):
+        """Persists a single item and returns its storage id."""
+        with self._write_lock():
+            return self._append(item)
+
+    def update(self, item_id, item):
+        """Overwrites the stored item with id 'item_id' (as returned by append)."""
+        with self._write_lock():
+            self._update(item_id, item)
+
+    def replace_all(self, items):
+        """Atomically replaces the stored wardrobe with 'items'."""
+        with self._write_lock():
+            self._replace_all(items)
+
+    def tracked(self, write, *args):
+        """
+        Runs one write ('append', 'update' or 'replace_all') and returns (result, fingerprint before,
+        fingerprint after). Both fingerprints are read under the write lock, so no other writer, in this
+        process or another, can land in between: if 'before' is what the caller last saw, the only
+        change between the two is this write.
+        """
+        with self._write_lock():
+            before = self.fingerprint()
+            result = getattr(self, '_' + write)(*args)
+            return result, before, self.fingerprint()
+
+    def _write_lock(self):
+        """Context manager held by every write (shared with other processes using the same store)."""
+        raise NotImplementedError
+
+    def _append(self, item):
+        raise NotImplementedError
+
+    def _update(self, item_id, item):
+        raise NotImplementedError
+
+    def _replace_all(self, items):
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """Cheap change marker (mtime/size of the backing files) used to spot writes from other processes."""
+        marks = []
+        for path in self._watched_files():
+            try:
+                stat = os.stat(path)
+                marks.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                marks.append(None)
+        return tuple(marks)
+
+    def _watched_files(self):
+        return (self.path,)
+
+    def label_color_pairs(self):
+        """Returns (label, color) for every item; enough to rebuild the summary aggregates."""
+        return [(item.get('label', 'unknown item'), item.get('color')) for item in self.load_all()]
+
+    def label_counts(self):
+        """Returns (label, count) pairs in first-seen order."""
+        counts = {}
+        for item in self.load_all():
+            label = item.get('label', 'unknown item')
+            counts[label] = counts.get(label, 0) + 1
+        return list(counts.items())
+
+    def close(self):
+        pass
+
+
+class JsonFileBackend(WardrobeBackend):
+    """
+    The original single-file JSON store. Every append rewrites the file (O(n)).
+    Each row carries a stable 'id' like an SQLite rowid: never reused, and unaffected by
+    compaction or by other processes' writes. Rows from older files get one when they are read.
+    """
+
+    name = 'json'
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._lock = threading.Lock()
+        # Highest id ever handed out, so ids of rows removed by a compaction are not reused
+        self._last_id_path = path + '.last_id'
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                wardrobe = json.load(f)
+        except FileNotFoundError:
+            print(f"Wardrobe file not found: {self.path}. Starting fresh.")
+            return []
+        except json.JSONDecodeError:
+            print("Wardrobe file is corrupted. Starting fresh.")
+            return []
+        self._assign_ids(wardrobe)
+        return wardrobe
+
+    def _read_last_id(self):
+        try:
+            with open(self._last_id_path, 'r') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _assign_ids(self, rows):
+        """Gives rows without an id the next ones, in file order. Returns the highest id in use."""
+        last_id = max([self._read_last_id()] + [row['id'] for row in rows if 'id' in row])
+        for row in rows:
+            if 'id' not in row:
+                last_id += 1
+                row['id'] = last_id
+        return last_id
+
+    def _write(self, wardrobe, last_id):
+        _atomic_write_json(self.path, wardrobe)
+        with open(self._last_id_path, 'w') as f:
+            f.write(str(last_id))
+
+    def load_all(self):
+        return self._read()
+
+    @contextmanager
+    def _write_lock(self):
+        # Read-modify-write has to happen under one lock, otherwise two
+        # concurrent adds both read the old list and one of them is lost.
+        with self._lock, _file_lock(self.path):
+            yield
+
+    def _append(self, item):
+        wardrobe = self._read()
+        item_id = self._assign_ids(wardrobe) + 1
+        wardrobe.append(dict(item, id=item_id))
+        self._write(wardrobe, item_id)
+        return item_id
+
+    def _update(self, item_id, item):
+        wardrobe = self._read()
+        for index, row in enumerate(wardrobe):
+            if row['id'] == item_id:
+                wardrobe[index] = dict(item, id=item_id)
+                self._write(wardrobe, self._assign_ids(wardrobe))
+                return
+
+    def _replace_all(self, items):
+        wardrobe = [dict(item) for item in items]
+        self._write(wardrobe, self._assign_ids(wardrobe))
+
+
+class SQLiteBackend(WardrobeBackend):
+    """
+    SQLite store with indexes on label, color and added_on.
+    Appends are a single INSERT, so they stay cheap as the wardrobe grows,
+    and SQLite's own locking keeps concurrent writers (threads or processes) safe.
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS items ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " label TEXT NOT NULL,"
+        " color TEXT,"
+        " added_on TEXT NOT NULL,"
+        " data TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_items_label ON items(label)",
+        "CREATE INDEX IF NOT EXISTS idx_items_color ON items(color)",
+        "CREATE INDEX IF NOT EXISTS idx_items_added_on ON items(added_on)",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    )
+
+    def __init__(self, path):
+        super().__init__(path)
+        # One connection per thread: sqlite3 connections must not be shared across threads.
+        self._local = threading.local()
+        with self._transaction() as conn:
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so writers queue instead of deadlocking."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _row_values(item):
+        # The rowid is the id here; an 'id' carried over from a JSON wardrobe is dropped
+        item = {key: value for key, value in item.items() if key != 'id'}
+        return (
+            item.get('label', 'unknown item'),
+            item.get('color'),
+            item.get('added_on', ''),
+            json.dumps(item),
+        )
+
+    def load_all(self):
+        rows = self._connect().execute("SELECT data FROM items ORDER BY id").fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def _write_lock(self):
+        # SQLite serializes the writes themselves; this lock also covers the fingerprint reads
+        # around them (see tracked()). flock conflicts between threads of one process too.
+        return _file_lock(self.path)
+
+    def _append(self, item):
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO items (label, color, added_on, data) VALUES (?, ?, ?, ?)",
+                self._row_values(item),
+            )
+            return cursor.lastrowid
+
+    def _update(self, item_id, item):
+        label, color, added_on, data = self._row_values(item)
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE items SET label = ?, color = ?, added_on = ?, data = ? WHERE id = ?",
+                (label, color, added_on, data, item_id),
+            )
+
+    def _replace_all(self, items):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM items")
+            conn.executemany(
+                "INSERT INTO items (label, color, added_on, data) VALUES (?, ?, ?, ?)",
+                [self._row_values(item) for item in items],
+            )
+
+    def _watched_files(self):
+        # In WAL mode commits land in the -wal file until the next checkpoint.
+        return (self.path, self.path + '-wal')
+
+    def label_color_pairs(self):
+        return self._connect().execute("SELECT label, color FROM items ORDER BY id").fetchall()
+
+    def label_counts(self):
+        rows = self._connect().execute(
+            "SELECT label, COUNT(*) FROM items GROUP BY label ORDER BY MIN(id)"
+        ).fetchall()
+        return [(label, count) for label, count in rows]
+
+    def is_empty(self):
+        return self._connect().execute("SELECT 1 FROM items LIMIT 1").fetchone() is None
+
+    def get_meta(self, key):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._write_lock(), self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+BACKENDS = {
+    JsonFileBackend.name: JsonFileBackend,
+    SQLiteBackend.name: SQLiteBackend,
+}
+
+
+def create_backend(name, path):
+    """Builds a storage backend by name ('sqlite' or 'json')."""
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown wardrobe backend '{name}'. Choose one of: {', '.join(BACKENDS)}.")
+    return backend_cls(path)
+
+
+def migrate_json_to_sqlite(json_path, db_path, force=False):
+    """
+    One-shot import of a legacy JSON wardrobe into the SQLite store.
+    Returns the number of imported items (0 if the migration already ran or there is nothing to import).
+    The JSON file is left untouched as a backup.
+    """
+    db = SQLiteBackend(db_path)
+    try:
+        if not force and db.get_meta('migrated_from_json'):
+            return 0
+        if not os.path.exists(json_path):
+            return 0
+        items = JsonFileBackend(json_path).load_all()
+        if force:
+            db.replace_all(items)
+        else:
+            if not db.is_empty():
+                # Never clobber a store that already has data of its own.
+                print(f"Skipping migration: {db_path} already contains items.")
+                db.set_meta('migrated_from_json', os.path.abspath(json_path))
+                return 0
+            with db._transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO items (label, color, added_on, data) VALUES (?, ?, ?, ?)",
+                    [db._row_values(item) for item in items],
+                )
+        db.set_meta('migrated_from_json', os.path.abspath(json_path))
+        print(f"Migrated {len(items)} items from {json_path} to {db_path}.")
+        return len(items)
+    finally:
+        db.close()